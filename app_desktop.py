@@ -2413,26 +2413,18 @@ class MainWindow(QWidget):
 
                         if data:
                             # Store as area-based data for calibration
-                            self.db.conn.execute("""
-                                INSERT INTO real_traffic_data
-                                (area_id, timestamp, travel_time_seconds, distance_meters,
-                                 traffic_delay_seconds, speed_kmh, data_source,
-                                 origin_lat, origin_lon, dest_lat, dest_lon)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                scenario_id,
-                                data['timestamp'],
-                                data['travel_time_seconds'],
-                                data['distance_meters'],
-                                data['traffic_delay_seconds'],
-                                data['speed_kmh'],
-                                'google_maps',
-                                route['origin_lat'],
-                                route['origin_lon'],
-                                route['dest_lat'],
-                                route['dest_lon']
-                            ))
-                            self.db.conn.commit()
+                            self.db.store_od_traffic_sample(
+                                origin_lat=route['origin_lat'],
+                                origin_lon=route['origin_lon'],
+                                dest_lat=route['dest_lat'],
+                                dest_lon=route['dest_lon'],
+                                travel_time_seconds=data['travel_time_seconds'],
+                                distance_meters=data['distance_meters'],
+                                traffic_delay_seconds=data['traffic_delay_seconds'],
+                                speed_kmh=data['speed_kmh'],
+                                area_id=scenario_id,
+                                timestamp=data['timestamp']
+                            )
 
                             collected_count += 1
                             self.log(f"    ✓ Speed: {data['speed_kmh']:.1f} km/h, "
@@ -2770,25 +2762,17 @@ class MainWindow(QWidget):
 
                     if data:
                         # Store in database
-                        self.db.conn.execute("""
-                            INSERT INTO real_traffic_data
-                            (timestamp, travel_time_seconds, distance_meters,
-                             traffic_delay_seconds, speed_kmh, data_source,
-                             origin_lat, origin_lon, dest_lat, dest_lon)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            data['timestamp'],
-                            data['travel_time_seconds'],
-                            data['distance_meters'],
-                            data['traffic_delay_seconds'],
-                            data['speed_kmh'],
-                            'google_maps',
-                            route['origin_lat'],
-                            route['origin_lon'],
-                            route['dest_lat'],
-                            route['dest_lon']
-                        ))
-                        self.db.conn.commit()
+                        self.db.store_od_traffic_sample(
+                            origin_lat=route['origin_lat'],
+                            origin_lon=route['origin_lon'],
+                            dest_lat=route['dest_lat'],
+                            dest_lon=route['dest_lon'],
+                            travel_time_seconds=data['travel_time_seconds'],
+                            distance_meters=data['distance_meters'],
+                            traffic_delay_seconds=data['traffic_delay_seconds'],
+                            speed_kmh=data['speed_kmh'],
+                            timestamp=data['timestamp']
+                        )
 
                         collected += 1
                         self.log(f"  ✓ Speed: {data['speed_kmh']:.1f} km/h, Time: {data['travel_time_seconds']}s", "SUCCESS")
@@ -4193,14 +4177,14 @@ class MainWindow(QWidget):
 
             if result:
                 status_label = self.findChild(QLabel, f"status_{route_num}")
-                status_label.setText(f"✅ Data collected: {result['speed_kmh']} km/h")
+                status_label.setText(f"✅ Data collected: {result['speed_kmh']:.2f} km/h")
                 status_label.setStyleSheet("color: #4CAF50;")
 
                 QMessageBox.information(
                     self, "Success",
                     f"Data collected for Route {route_num}:\n"
                     f"Travel time: {result['travel_time_seconds']}s\n"
-                    f"Speed: {result['speed_kmh']} km/h"
+                    f"Speed: {result['speed_kmh']:.2f} km/h"
                 )
             else:
                 QMessageBox.warning(self, "Failed", f"Could not collect data for Route {route_num}")
@@ -4285,7 +4269,7 @@ class MainWindow(QWidget):
                 if result:
                     success_count += 1
                     status_label = self.findChild(QLabel, f"status_{route_num}")
-                    status_label.setText(f"✅ {result['speed_kmh']} km/h")
+                    status_label.setText(f"✅ {result['speed_kmh']:.2f} km/h")
                     status_label.setStyleSheet("color: #4CAF50;")
 
             QMessageBox.information(
@@ -4596,6 +4580,12 @@ class MainWindow(QWidget):
                     )
                     self.area_bbox_label.setStyleSheet("color: #4CAF50; font-weight: bold;")
 
+                    if area.get('last_snapshot_ts'):
+                        self.snapshot_info_label.setText(
+                            f"Latest snapshot: {area['last_snapshot_ts'][:16].replace('T', ' ')}, "
+                            f"Avg speed: {area['last_avg_speed_kmh'] or 0:.1f} km/h"
+                        )
+
                     self.training_area_info.setText(
                         f"Area: {area['name']} (ID: {area_id})"
                     )
@@ -0,0 +1,130 @@
+"""
+Numeric kernels for probe route generation
+Geometry is computed into (N, 4) float64 arrays of
+(origin_lat, origin_lon, dest_lat, dest_lon); callers wrap rows into dicts
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """No-op stand-in when numba is not installed"""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def _grid_coords(north, south, east, west):
+    """
+    Coordinates of the 8 grid template routes
+
+    Returns:
+        (8, 4) array of (origin_lat, origin_lon, dest_lat, dest_lon),
+        rows in the same order as GRID_TEMPLATE_META
+    """
+    lat_diff = abs(north - south)
+    lon_diff = abs(east - west)
+    center_lat = (north + south) / 2
+    center_lon = (east + west) / 2
+
+    # Padding (don't start exactly at edges)
+    pad_lat = lat_diff * 0.15
+    pad_lon = lon_diff * 0.15
+
+    out = np.empty((8, 4))
+
+    # 1. Main horizontal (W→E through center)
+    out[0, 0] = center_lat
+    out[0, 1] = west + pad_lon
+    out[0, 2] = center_lat
+    out[0, 3] = east - pad_lon
+
+    # 2. Main vertical (S→N through center)
+    out[1, 0] = south + pad_lat
+    out[1, 1] = center_lon
+    out[1, 2] = north - pad_lat
+    out[1, 3] = center_lon
+
+    # 3. Main diagonal (SW→NE)
+    out[2, 0] = south + pad_lat
+    out[2, 1] = west + pad_lon
+    out[2, 2] = north - pad_lat
+    out[2, 3] = east - pad_lon
+
+    # 4. Reverse diagonal (NW→SE)
+    out[3, 0] = north - pad_lat
+    out[3, 1] = west + pad_lon
+    out[3, 2] = south + pad_lat
+    out[3, 3] = east - pad_lon
+
+    # 5. Northern horizontal
+    out[4, 0] = north - pad_lat * 1.5
+    out[4, 1] = west + pad_lon
+    out[4, 2] = north - pad_lat * 1.5
+    out[4, 3] = east - pad_lon
+
+    # 6. Southern horizontal
+    out[5, 0] = south + pad_lat * 1.5
+    out[5, 1] = west + pad_lon
+    out[5, 2] = south + pad_lat * 1.5
+    out[5, 3] = east - pad_lon
+
+    # 7. Western vertical
+    out[6, 0] = south + pad_lat
+    out[6, 1] = west + pad_lon * 1.5
+    out[6, 2] = north - pad_lat
+    out[6, 3] = west + pad_lon * 1.5
+
+    # 8. Eastern vertical
+    out[7, 0] = south + pad_lat
+    out[7, 1] = east - pad_lon * 1.5
+    out[7, 2] = north - pad_lat
+    out[7, 3] = east - pad_lon * 1.5
+
+    return out
+
+
+# (name, type, description) for each row of _grid_coords
+GRID_TEMPLATE_META = (
+    ('Main Horizontal (W→E)', 'horizontal', 'Main east-west corridor through center'),
+    ('Main Vertical (S→N)', 'vertical', 'Main north-south corridor through center'),
+    ('Main Diagonal (SW→NE)', 'diagonal', 'Southwest to northeast diagonal'),
+    ('Reverse Diagonal (NW→SE)', 'diagonal', 'Northwest to southeast diagonal'),
+    ('Northern Route (W→E)', 'horizontal', 'Northern east-west corridor'),
+    ('Southern Route (W→E)', 'horizontal', 'Southern east-west corridor'),
+    ('Western Route (S→N)', 'vertical', 'Western north-south corridor'),
+    ('Eastern Route (S→N)', 'vertical', 'Eastern north-south corridor'),
+)
+
+
+def _radial_coords(center_lat, center_lon, radius_lat, radius_lon, num_routes):
+    """Routes from the center to num_routes evenly spaced points on an ellipse"""
+    angles = np.linspace(0.0, 2 * np.pi, num_routes, endpoint=False)
+
+    out = np.empty((num_routes, 4))
+    out[:, 0] = center_lat
+    out[:, 1] = center_lon
+    out[:, 2] = center_lat + radius_lat * np.sin(angles)
+    out[:, 3] = center_lon + radius_lon * np.cos(angles)
+    return out
+
+
+def _loop_coords(center_lat, center_lon, lat_diff, lon_diff, num_loops):
+    """
+    Corner-to-corner routes of concentric squares around the center
+
+    Returns:
+        ((num_loops, 4) array, scales) - scales are 0.2, 0.45, 0.7, ...
+    """
+    scales = 0.2 + np.arange(num_loops) * 0.25
+    offset_lat = lat_diff * scales
+    offset_lon = lon_diff * scales
+
+    out = np.empty((num_loops, 4))
+    out[:, 0] = center_lat - offset_lat
+    out[:, 1] = center_lon - offset_lon
+    out[:, 2] = center_lat + offset_lat
+    out[:, 3] = center_lon + offset_lon
+    return out, scales
@@ -426,13 +426,7 @@ class AreaManager:
         )
 
         # Update database
-        cursor = self.db.conn.cursor()
-        cursor.execute("""
-            UPDATE monitored_areas
-            SET sumo_network_file = ?
-            WHERE area_id = ?
-        """, (network_file, area_id))
-        self.db.conn.commit()
+        self.db.set_area_network_file(area_id, network_file)
 
         print(f"[AREA MANAGER] Network built: {network_file}")
 
@@ -3,13 +3,53 @@ Area-Wide Data Collector
 Extends TrafficDataCollector to collect traffic data across entire geographic area
 Uses grid-based sampling to capture area-wide traffic patterns
 """
+import asyncio
+import multiprocessing
+import os
 import time
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional
 from modules.database import get_db
 from modules.data_collector import TrafficDataCollector
 
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _snapshot_reduce(speeds, travel_times, mask):
+        """Fused single-pass (count, sum, sum_sq, min, max, tt_sum) over collected routes"""
+        count = 0
+        s_sum = 0.0
+        s_sq = 0.0
+        s_min = np.inf
+        s_max = -np.inf
+        tt_sum = 0.0
+        for i in prange(speeds.shape[0]):
+            if mask[i]:
+                v = speeds[i]
+                count += 1
+                s_sum += v
+                s_sq += v * v
+                s_min = min(s_min, v)
+                s_max = max(s_max, v)
+                tt_sum += travel_times[i]
+        return count, s_sum, s_sq, s_min, s_max, tt_sum
+else:
+    def _snapshot_reduce(speeds, travel_times, mask):
+        """NumPy fallback for the fused snapshot reduction"""
+        v = speeds[mask]
+        return (
+            int(v.size), float(v.sum()), float(np.dot(v, v)),
+            float(v.min()), float(v.max()), float(travel_times[mask].sum())
+        )
+
 
 class AreaWideCollector:
     """
@@ -48,6 +88,13 @@ class AreaWideCollector:
         # Generate sampling grid
         self.sampling_routes = self._generate_sampling_grid()
 
+        # Cache OD coordinates as flat arrays so the collection loop
+        # indexes by position instead of walking nested dicts
+        self._olat = np.array([r['origin']['lat'] for r in self.sampling_routes], dtype=float)
+        self._olon = np.array([r['origin']['lon'] for r in self.sampling_routes], dtype=float)
+        self._dlat = np.array([r['destination']['lat'] for r in self.sampling_routes], dtype=float)
+        self._dlon = np.array([r['destination']['lon'] for r in self.sampling_routes], dtype=float)
+
         print(f"[AREA COLLECTOR] Initialized for: {self.area['name']}")
         print(f"[AREA COLLECTOR] Grid size: {grid_size}x{grid_size}")
         print(f"[AREA COLLECTOR] Sampling routes: {len(self.sampling_routes)}")
@@ -119,11 +166,15 @@ class AreaWideCollector:
 
         return sampling_routes
 
-    def collect_area_snapshot(self) -> Dict:
+    def collect_area_snapshot(self, collections_completed: int = None) -> Dict:
         """
         Collect one complete snapshot of area traffic
         Samples all grid routes
 
+        Args:
+            collections_completed: If given, also record this training
+                progress, in the same transaction as the snapshot rows
+
         Returns:
             Dict with snapshot data and statistics
         """
@@ -134,67 +185,80 @@ class AreaWideCollector:
         print(f"[AREA COLLECTOR] Time: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"[AREA COLLECTOR] Sampling {len(self.sampling_routes)} routes...")
 
+        num_routes = len(self.sampling_routes)
         samples = []
-        speeds = []
-        travel_times = []
-
-        for i, route in enumerate(self.sampling_routes):
-            # Rate limiting
-            if i > 0 and i % 10 == 0:
-                print(f"[AREA COLLECTOR] Progress: {i}/{len(self.sampling_routes)} routes sampled")
-                time.sleep(1)  # Small delay every 10 requests
-
-            # Collect traffic data using existing collector
-            try:
-                data = self.collector.fetch_route_traffic(
-                    origin_lat=route['origin']['lat'],
-                    origin_lon=route['origin']['lon'],
-                    dest_lat=route['destination']['lat'],
-                    dest_lon=route['destination']['lon'],
-                    route_id=None  # Not tied to specific route
-                )
-
-                if data:
-                    # Store in database with area_id
-                    self.db.store_area_traffic_sample(
-                        area_id=self.area_id,
-                        snapshot_id=snapshot_id,
-                        origin_lat=route['origin']['lat'],
-                        origin_lon=route['origin']['lon'],
-                        dest_lat=route['destination']['lat'],
-                        dest_lon=route['destination']['lon'],
-                        travel_time_seconds=data['travel_time_seconds'],
-                        distance_meters=data['distance_meters'],
-                        speed_kmh=data['speed_kmh']
-                    )
-
-                    samples.append(data)
-                    speeds.append(data['speed_kmh'])
-                    travel_times.append(data['travel_time_seconds'])
+        sample_rows = []
+        speeds = np.empty(num_routes)
+        travel_times = np.empty(num_routes)
+        collected = np.zeros(num_routes, dtype=bool)
+
+        olat = self._olat.tolist()
+        olon = self._olon.tolist()
+        dlat = self._dlat.tolist()
+        dlon = self._dlon.tolist()
+
+        last_reported = 0
+
+        def report_progress(done, total):
+            # Every 10 routes, like the old per-route loop
+            nonlocal last_reported
+            if done < total and done // 10 > last_reported // 10:
+                print(f"[AREA COLLECTOR] Progress: {done}/{total} routes sampled")
+            last_reported = done
+
+        # Collect traffic data in Distance Matrix batches (rate limited by the collector)
+        batch = self.collector.fetch_route_traffic_batch(
+            list(zip(olat, olon)),
+            list(zip(dlat, dlon)),
+            progress_callback=report_progress
+        )
 
-            except Exception as e:
-                print(f"[AREA COLLECTOR] Error sampling route {i}: {e}")
-                continue
+        for i, data in enumerate(batch):
+            if data:
+                # Stored with area_id in one transaction after the loop
+                sample_rows.append((
+                    olat[i], olon[i], dlat[i], dlon[i],
+                    data['travel_time_seconds'],
+                    data['distance_meters'],
+                    data['speed_kmh']
+                ))
+
+                samples.append(data)
+                speeds[i] = data['speed_kmh']
+                travel_times[i] = data['travel_time_seconds']
+                collected[i] = True
 
         # Calculate statistics
         if samples:
-            avg_speed = np.mean(speeds)
-            min_speed = np.min(speeds)
-            max_speed = np.max(speeds)
-            std_speed = np.std(speeds)
-
-            # Store aggregated snapshot
-            self.db.store_area_snapshot(
-                area_id=self.area_id,
-                snapshot_id=snapshot_id,
-                num_samples=len(samples),
-                avg_speed_kmh=avg_speed,
-                min_speed_kmh=min_speed,
-                max_speed_kmh=max_speed
+            count, s_sum, s_sq, min_speed, max_speed, tt_sum = _snapshot_reduce(
+                speeds, travel_times, collected
             )
 
+            avg_speed = s_sum / count
+            std_speed = max(s_sq / count - avg_speed * avg_speed, 0.0) ** 0.5
+            avg_travel_time = tt_sum / count
+
+        # Samples, aggregated snapshot and progress: one commit per tick
+        with self.db.batch():
+            if sample_rows:
+                self.db.store_area_traffic_samples_bulk(self.area_id, snapshot_id, sample_rows)
+
+            if samples:
+                self.db.store_area_snapshot(
+                    area_id=self.area_id,
+                    snapshot_id=snapshot_id,
+                    num_samples=len(samples),
+                    avg_speed_kmh=avg_speed,
+                    min_speed_kmh=min_speed,
+                    max_speed_kmh=max_speed
+                )
+
+            if collections_completed is not None:
+                self.db.update_area_training_progress(self.area_id, collections_completed)
+
+        if samples:
             print(f"\n[AREA COLLECTOR] Snapshot complete!")
-            print(f"  Samples collected: {len(samples)}/{len(self.sampling_routes)}")
+            print(f"  Samples collected: {len(samples)}/{num_routes}")
             print(f"  Avg speed: {avg_speed:.1f} km/h")
             print(f"  Speed range: {min_speed:.1f} - {max_speed:.1f} km/h")
             print(f"  Std dev: {std_speed:.1f} km/h")
@@ -203,13 +267,13 @@ class AreaWideCollector:
                 'snapshot_id': snapshot_id,
                 'timestamp': timestamp.isoformat(),
                 'num_samples': len(samples),
-                'success_rate': len(samples) / len(self.sampling_routes) * 100,
+                'success_rate': len(samples) / num_routes * 100,
                 'statistics': {
                     'avg_speed_kmh': avg_speed,
                     'min_speed_kmh': min_speed,
                     'max_speed_kmh': max_speed,
                     'std_speed_kmh': std_speed,
-                    'avg_travel_time_seconds': np.mean(travel_times)
+                    'avg_travel_time_seconds': avg_travel_time
                 },
                 'samples': samples
             }
@@ -264,11 +328,8 @@ class AreaWideCollector:
                 print(f"\n[COLLECTION #{collection_count}/{total_collections}]")
                 print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-                # Collect snapshot
-                snapshot = self.collect_area_snapshot()
-
-                # Update progress in database
-                self.db.update_area_training_progress(self.area_id, collection_count)
+                # Collect snapshot and update progress in database
+                snapshot = self.collect_area_snapshot(collections_completed=collection_count)
 
                 # Call progress callback if provided
                 if progress_callback:
@@ -306,12 +367,13 @@ class AreaWideCollector:
             print(f"Total samples: {total_samples}")
             print(f"{'='*70}\n")
 
-    def get_collection_statistics(self, days: int = 7) -> Dict:
+    def get_collection_statistics(self, days: int = 7, include_snapshots: bool = True) -> Dict:
         """
         Get statistics for recent collections
 
         Args:
             days: Number of days to analyze
+            include_snapshots: Also return the raw snapshot rows
 
         Returns:
             Dict with statistics
@@ -319,35 +381,27 @@ class AreaWideCollector:
         from datetime import timedelta
 
         start_time = (datetime.now() - timedelta(days=days)).isoformat()
-        snapshots = self.db.get_area_snapshots(self.area_id, limit=None)
+        speed_stats = self.db.get_area_speed_stats(self.area_id, start_time=start_time)
+        num_snapshots = speed_stats.pop('num_snapshots')
 
-        # Filter by time
-        recent_snapshots = [
-            s for s in snapshots
-            if s['snapshot_timestamp'] >= start_time
-        ]
-
-        if not recent_snapshots:
+        if not num_snapshots:
             return {
                 'num_snapshots': 0,
                 'time_range_days': days,
                 'statistics': None
             }
 
-        speeds = [s['avg_speed_kmh'] for s in recent_snapshots if s['avg_speed_kmh']]
-
-        return {
-            'num_snapshots': len(recent_snapshots),
+        result = {
+            'num_snapshots': num_snapshots,
             'time_range_days': days,
-            'statistics': {
-                'avg_speed_kmh': np.mean(speeds) if speeds else 0,
-                'min_speed_kmh': np.min(speeds) if speeds else 0,
-                'max_speed_kmh': np.max(speeds) if speeds else 0,
-                'std_speed_kmh': np.std(speeds) if speeds else 0
-            },
-            'snapshots': recent_snapshots
+            'statistics': speed_stats
         }
 
+        if include_snapshots:
+            result['snapshots'] = self.db.get_area_snapshots(self.area_id, start_time=start_time)
+
+        return result
+
     def get_grid_visualization_data(self) -> Dict:
         """
         Get data for visualizing the sampling grid
@@ -423,3 +477,112 @@ class ScheduledAreaCollector:
         """Stop scheduled collection"""
         self.running = False
         print("[SCHEDULED COLLECTOR] Stopping...")
+
+
+# Per-process collector cache used by AreaCollectorPool workers, so each
+# worker keeps its API client and DB connection across snapshots
+_worker_collectors: Dict[tuple, AreaWideCollector] = {}
+
+
+def _collect_snapshot_in_worker(api_key: str, area_id: str, grid_size: int, collections_completed: int) -> Dict:
+    """Collect one snapshot (and record its progress) inside a pool worker process"""
+    key = (area_id, grid_size)
+    collector = _worker_collectors.get(key)
+    if collector is None:
+        collector = AreaWideCollector(api_key, area_id, grid_size=grid_size)
+        _worker_collectors[key] = collector
+    return collector.collect_area_snapshot(collections_completed=collections_completed)
+
+
+class AreaCollectorPool:
+    """
+    Runs scheduled collection for several areas at once
+
+    Instead of one mostly-idle thread per ScheduledAreaCollector, a single
+    asyncio loop in the parent schedules every area and farms the snapshot
+    work out to a shared process pool of min(cpu_count, num_areas) workers.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        area_ids: List[str],
+        duration_hours: int,
+        interval_minutes: int = 15,
+        grid_size: int = 5,
+        max_workers: int = None
+    ):
+        self.api_key = api_key
+        self.area_ids = list(area_ids)
+        self.duration_hours = duration_hours
+        self.interval_minutes = interval_minutes
+        self.grid_size = grid_size
+        self.max_workers = max_workers or max(1, min(os.cpu_count() or 1, len(self.area_ids)))
+        self.running = False
+        # Opened in _run once the workers exist (see there)
+        self.db = None
+
+    def start(self, progress_callback=None):
+        """
+        Start scheduled collection for all areas (blocks until finished)
+
+        Args:
+            progress_callback: Optional callback function(area_id, current, total, snapshot_data)
+        """
+        self.running = True
+        try:
+            asyncio.run(self._run(progress_callback))
+        except KeyboardInterrupt:
+            print("\n[AREA POOL] Collection interrupted by user")
+        finally:
+            self.running = False
+
+    def stop(self):
+        """Stop scheduled collection after the current snapshots finish"""
+        self.running = False
+        print("[AREA POOL] Stopping...")
+
+    async def _run(self, progress_callback):
+        print(f"[AREA POOL] Collecting {len(self.area_ids)} areas with {self.max_workers} workers")
+
+        # Spawned, not forked: a forked worker would inherit the parent's
+        # SQLite connection, which must never be used across fork(). Each
+        # worker opens its own through get_db().
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            self.db = get_db()
+            await asyncio.gather(*(
+                self._collect_area(pool, area_id, progress_callback)
+                for area_id in self.area_ids
+            ))
+
+    async def _collect_area(self, pool: ProcessPoolExecutor, area_id: str, progress_callback):
+        loop = asyncio.get_running_loop()
+        interval_seconds = self.interval_minutes * 60
+        total_collections = max(1, int(self.duration_hours * 60) // self.interval_minutes)
+        next_run = loop.time()
+
+        for collection_count in range(1, total_collections + 1):
+            if not self.running:
+                break
+
+            try:
+                # The worker records progress with the snapshot it stores
+                snapshot = await loop.run_in_executor(
+                    pool, _collect_snapshot_in_worker,
+                    self.api_key, area_id, self.grid_size, collection_count
+                )
+            except Exception as e:
+                print(f"[AREA POOL] Error collecting {area_id}: {e}")
+                snapshot = None
+                self.db.update_area_training_progress(area_id, collection_count)
+
+            if progress_callback:
+                progress_callback(area_id, collection_count, total_collections, snapshot)
+
+            # Schedule against absolute deadlines so collection time doesn't drift
+            if collection_count < total_collections:
+                next_run += interval_seconds
+                await asyncio.sleep(max(0.0, next_run - loop.time()))
@@ -3,9 +3,48 @@ Automatic Route Generator for Selected Map Areas
 Intelligently creates probe routes within any selected bounding box
 """
 import json
-from typing import Dict, List, Tuple
+import numpy as np
+from typing import Dict, List
 from modules.database import get_db
+from modules._route_kernels import _grid_coords, _radial_coords, _loop_coords, GRID_TEMPLATE_META
 from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Compass labels for radial routes
+_COMPASS_8 = ('N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW')
+
+
+def _dump_json_bytes(obj) -> bytes:
+    """
+    Encode obj as indented UTF-8 JSON, using orjson when available
+    (non-ASCII names are written as UTF-8 either way, not as \\u escapes)
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _build_routes(coords: np.ndarray, meta) -> List[Dict]:
+    """Wrap (N, 4) kernel output and (name, type, description) rows into route dicts"""
+    return [
+        {
+            'name': name,
+            'origin_lat': olat,
+            'origin_lon': olon,
+            'dest_lat': dlat,
+            'dest_lon': dlon,
+            'type': route_type,
+            'description': description
+        }
+        for (olat, olon, dlat, dlon), (name, route_type, description)
+        in zip(coords.tolist(), meta)
+    ]
+
 
 class AutoRouteGenerator:
     """
@@ -41,195 +80,81 @@ class AutoRouteGenerator:
         Generate a grid of routes covering the area
         Creates horizontal, vertical, and diagonal routes
         """
-        routes = []
-        area_info = self.calculate_area_size(bbox)
-        
-        lat_diff = area_info['lat_diff']
-        lon_diff = area_info['lon_diff']
-        center_lat = area_info['center_lat']
-        center_lon = area_info['center_lon']
-        
-        # Add padding (don't start exactly at edges)
-        pad_lat = lat_diff * 0.15
-        pad_lon = lon_diff * 0.15
+        coords = _grid_coords(
+            float(bbox['north']), float(bbox['south']),
+            float(bbox['east']), float(bbox['west'])
+        )
         
-        # 1. Main horizontal route (West → East through center)
-        routes.append({
-            'name': 'Main Horizontal (W→E)',
-            'origin_lat': center_lat,
-            'origin_lon': bbox['west'] + pad_lon,
-            'dest_lat': center_lat,
-            'dest_lon': bbox['east'] - pad_lon,
-            'type': 'horizontal',
-            'description': 'Main east-west corridor through center'
-        })
-        
-        # 2. Main vertical route (South → North through center)
-        routes.append({
-            'name': 'Main Vertical (S→N)',
-            'origin_lat': bbox['south'] + pad_lat,
-            'origin_lon': center_lon,
-            'dest_lat': bbox['north'] - pad_lat,
-            'dest_lon': center_lon,
-            'type': 'vertical',
-            'description': 'Main north-south corridor through center'
-        })
-        
-        # 3. Main diagonal (SW → NE)
-        routes.append({
-            'name': 'Main Diagonal (SW→NE)',
-            'origin_lat': bbox['south'] + pad_lat,
-            'origin_lon': bbox['west'] + pad_lon,
-            'dest_lat': bbox['north'] - pad_lat,
-            'dest_lon': bbox['east'] - pad_lon,
-            'type': 'diagonal',
-            'description': 'Southwest to northeast diagonal'
-        })
-        
-        # 4. Reverse diagonal (NW → SE)
-        routes.append({
-            'name': 'Reverse Diagonal (NW→SE)',
-            'origin_lat': bbox['north'] - pad_lat,
-            'origin_lon': bbox['west'] + pad_lon,
-            'dest_lat': bbox['south'] + pad_lat,
-            'dest_lon': bbox['east'] - pad_lon,
-            'type': 'diagonal',
-            'description': 'Northwest to southeast diagonal'
-        })
-        
-        # 5. Northern horizontal route
-        routes.append({
-            'name': 'Northern Route (W→E)',
-            'origin_lat': bbox['north'] - pad_lat * 1.5,
-            'origin_lon': bbox['west'] + pad_lon,
-            'dest_lat': bbox['north'] - pad_lat * 1.5,
-            'dest_lon': bbox['east'] - pad_lon,
-            'type': 'horizontal',
-            'description': 'Northern east-west corridor'
-        })
-        
-        # 6. Southern horizontal route
-        routes.append({
-            'name': 'Southern Route (W→E)',
-            'origin_lat': bbox['south'] + pad_lat * 1.5,
-            'origin_lon': bbox['west'] + pad_lon,
-            'dest_lat': bbox['south'] + pad_lat * 1.5,
-            'dest_lon': bbox['east'] - pad_lon,
-            'type': 'horizontal',
-            'description': 'Southern east-west corridor'
-        })
-        
-        # 7. Western vertical route
-        routes.append({
-            'name': 'Western Route (S→N)',
-            'origin_lat': bbox['south'] + pad_lat,
-            'origin_lon': bbox['west'] + pad_lon * 1.5,
-            'dest_lat': bbox['north'] - pad_lat,
-            'dest_lon': bbox['west'] + pad_lon * 1.5,
-            'type': 'vertical',
-            'description': 'Western north-south corridor'
-        })
-        
-        # 8. Eastern vertical route
-        routes.append({
-            'name': 'Eastern Route (S→N)',
-            'origin_lat': bbox['south'] + pad_lat,
-            'origin_lon': bbox['east'] - pad_lon * 1.5,
-            'dest_lat': bbox['north'] - pad_lat,
-            'dest_lon': bbox['east'] - pad_lon * 1.5,
-            'type': 'vertical',
-            'description': 'Eastern north-south corridor'
-        })
-        
-        return routes[:num_routes]
+        return _build_routes(coords[:num_routes], GRID_TEMPLATE_META)
     
     def generate_radial_routes(
         self, 
         bbox: Dict, 
-        num_routes: int = 8
+        num_routes: int = 8,
+        area_info: Dict = None
     ) -> List[Dict]:
         """
         Generate radial routes from center to edges
         Good for city-center simulations
+        (area_info: calculate_area_size(bbox), if the caller already has it)
         """
-        import math
-        
-        routes = []
-        area_info = self.calculate_area_size(bbox)
-        
-        center_lat = area_info['center_lat']
-        center_lon = area_info['center_lon']
+        area_info = area_info or self.calculate_area_size(bbox)
         
         # Calculate radius (use smaller dimension)
         radius_lat = area_info['lat_diff'] * 0.4
         radius_lon = area_info['lon_diff'] * 0.4
         
-        # Create routes radiating outward
-        for i in range(num_routes):
-            angle = (2 * math.pi * i) / num_routes
-            
-            # Destination point on circle
-            dest_lat = center_lat + radius_lat * math.sin(angle)
-            dest_lon = center_lon + radius_lon * math.cos(angle)
-            
-            # Direction name
-            directions = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
-            direction = directions[i % len(directions)]
-            
-            routes.append({
-                'name': f'Radial to {direction}',
-                'origin_lat': center_lat,
-                'origin_lon': center_lon,
-                'dest_lat': dest_lat,
-                'dest_lon': dest_lon,
-                'type': 'radial',
-                'description': f'Route from center toward {direction}'
-            })
+        coords = _radial_coords(
+            area_info['center_lat'], area_info['center_lon'],
+            radius_lat, radius_lon, num_routes
+        )
         
-        return routes
+        directions = [_COMPASS_8[i % 8] for i in range(num_routes)]
+        meta = [
+            (f'Radial to {d}', 'radial', f'Route from center toward {d}')
+            for d in directions
+        ]
+        
+        return _build_routes(coords, meta)
     
     def generate_loop_routes(
         self, 
         bbox: Dict, 
-        num_loops: int = 3
+        num_loops: int = 3,
+        area_info: Dict = None
     ) -> List[Dict]:
         """
         Generate circular/loop routes at different scales
         Good for traffic circulation patterns
+        (area_info: calculate_area_size(bbox), if the caller already has it)
         """
-        routes = []
-        area_info = self.calculate_area_size(bbox)
-        
-        center_lat = area_info['center_lat']
-        center_lon = area_info['center_lon']
-        
-        # Create concentric loops
-        for i in range(num_loops):
-            scale = 0.2 + (i * 0.25)  # 20%, 45%, 70% of area
-            
-            # Create 4 points of a loop (approximate circle with square)
-            offset_lat = area_info['lat_diff'] * scale
-            offset_lon = area_info['lon_diff'] * scale
-            
-            # Loop: go around the perimeter
-            routes.append({
-                'name': f'Loop {i+1} ({"Small" if i==0 else "Medium" if i==1 else "Large"})',
-                'origin_lat': center_lat - offset_lat,
-                'origin_lon': center_lon - offset_lon,
-                'dest_lat': center_lat + offset_lat,
-                'dest_lon': center_lon + offset_lon,
-                'type': 'loop',
-                'description': f'Circular route at {scale*100:.0f}% of area'
-            })
+        area_info = area_info or self.calculate_area_size(bbox)
+        
+        # Concentric loops at 20%, 45%, 70% of area
+        # (approximate circle with square, corner to corner)
+        coords, scales = _loop_coords(
+            area_info['center_lat'], area_info['center_lon'],
+            area_info['lat_diff'], area_info['lon_diff'], num_loops
+        )
+        
+        meta = [
+            (
+                f'Loop {i+1} ({"Small" if i==0 else "Medium" if i==1 else "Large"})',
+                'loop',
+                f'Circular route at {scale*100:.0f}% of area'
+            )
+            for i, scale in enumerate(scales.tolist())
+        ]
         
-        return routes
+        return _build_routes(coords, meta)
     
     def auto_generate_for_area(
         self,
         bbox: Dict,
         location_name: str,
         strategy: str = 'grid',  # 'grid', 'radial', 'loop', or 'mixed'
-        num_routes: int = 8
+        num_routes: int = 8,
+        verbose: bool = True
     ) -> List[Dict]:
         """
         Main function: Auto-generate routes for selected area
@@ -239,59 +164,63 @@ class AutoRouteGenerator:
             location_name: Name for the location
             strategy: Route generation strategy
             num_routes: Number of routes to generate
+            verbose: Print progress (disable for batch pipelines)
         
         Returns:
             List of created route dictionaries
         """
-        print("\n" + "="*70)
-        print("AUTO-GENERATING PROBE ROUTES")
-        print("="*70)
-        
+        # Computed once, shared by the generators and the saved bbox info
         area_info = self.calculate_area_size(bbox)
         
-        print(f"Location: {location_name}")
-        print(f"Area: {area_info['area_km2']:.2f} km²")
-        print(f"Center: ({area_info['center_lat']:.6f}, {area_info['center_lon']:.6f})")
-        print(f"Strategy: {strategy}")
-        print(f"Routes to create: {num_routes}")
-        print("="*70 + "\n")
+        if verbose:
+            print("\n".join([
+                "\n" + "="*70,
+                "AUTO-GENERATING PROBE ROUTES",
+                "="*70,
+                f"Location: {location_name}",
+                f"Area: {area_info['area_km2']:.2f} km²",
+                f"Center: ({area_info['center_lat']:.6f}, {area_info['center_lon']:.6f})",
+                f"Strategy: {strategy}",
+                f"Routes to create: {num_routes}",
+                "="*70 + "\n"
+            ]))
         
         # Generate routes based on strategy
         if strategy == 'grid':
             route_templates = self.generate_grid_routes(bbox, num_routes)
         elif strategy == 'radial':
-            route_templates = self.generate_radial_routes(bbox, num_routes)
+            route_templates = self.generate_radial_routes(bbox, num_routes, area_info)
         elif strategy == 'loop':
-            route_templates = self.generate_loop_routes(bbox, min(num_routes, 3))
+            route_templates = self.generate_loop_routes(bbox, min(num_routes, 3), area_info)
         elif strategy == 'mixed':
             # Combine strategies
             grid_routes = self.generate_grid_routes(bbox, num_routes // 2)
-            radial_routes = self.generate_radial_routes(bbox, num_routes // 2)
+            radial_routes = self.generate_radial_routes(bbox, num_routes // 2, area_info)
             route_templates = grid_routes + radial_routes
         else:
             route_templates = self.generate_grid_routes(bbox, num_routes)
         
-        # First, deactivate old routes for this location
-        self._deactivate_old_routes(location_name)
+        # Route ids and display names, computed up front for the batch insert
+        route_ids = [
+            f"{location_name}_{t['type']}_{i+1}".replace(" ", "_").lower()
+            for i, t in enumerate(route_templates)
+        ]
+        full_names = [f"{location_name}: {t['name']}" for t in route_templates]
         
         # Add routes to database
         created_routes = []
-        
-        for i, template in enumerate(route_templates):
-            route_id = f"{location_name}_{template['type']}_{i+1}".replace(" ", "_").lower()
-            
-            full_name = f"{location_name}: {template['name']}"
-            
-            # Add to database
-            self.db.add_probe_route(
-                route_id=route_id,
-                name=full_name,
-                origin_lat=template['origin_lat'],
-                origin_lon=template['origin_lon'],
-                dest_lat=template['dest_lat'],
-                dest_lon=template['dest_lon'],
-                description=template['description']
-            )
+        rows = []
+        
+        for route_id, full_name, template in zip(route_ids, full_names, route_templates):
+            rows.append((
+                route_id,
+                full_name,
+                template['origin_lat'],
+                template['origin_lon'],
+                template['dest_lat'],
+                template['dest_lon'],
+                template['description']
+            ))
             
             route_dict = {
                 'route_id': route_id,
@@ -305,38 +234,49 @@ class AutoRouteGenerator:
             }
             
             created_routes.append(route_dict)
-            
-            print(f"✅ Created: {full_name}")
-            print(f"   Origin: ({template['origin_lat']:.6f}, {template['origin_lon']:.6f})")
-            print(f"   Dest:   ({template['dest_lat']:.6f}, {template['dest_lon']:.6f})")
-            print(f"   Type:   {template['type']}")
-            print()
         
-        # Save bbox info for future reference
-        self._save_bbox_info(bbox, location_name, created_routes)
+        # Deactivate old routes for this location and insert the new ones
+        # in a single transaction
+        self.db.add_probe_routes_bulk(
+            rows,
+            deactivate_prefix=location_name.replace(" ", "_").lower()
+        )
+        
+        if verbose:
+            print("\n".join(
+                f"✅ Created: {r['name']}\n"
+                f"   Origin: ({r['origin_lat']:.6f}, {r['origin_lon']:.6f})\n"
+                f"   Dest:   ({r['dest_lat']:.6f}, {r['dest_lon']:.6f})\n"
+                f"   Type:   {r['type']}\n"
+                for r in created_routes
+            ))
         
-        print("="*70)
-        print(f"✅ AUTO-GENERATED {len(created_routes)} ROUTES")
-        print("="*70)
-        print(f"💡 These routes cover your selected simulation area")
-        print(f"💡 They will be tracked during simulation")
-        print(f"💡 Strategy used: {strategy}")
-        print("="*70 + "\n")
+        # Save bbox info for future reference
+        self._save_bbox_info(bbox, location_name, created_routes, verbose=verbose, area_info=area_info)
+        
+        if verbose:
+            print("\n".join([
+                "="*70,
+                f"✅ AUTO-GENERATED {len(created_routes)} ROUTES",
+                "="*70,
+                f"💡 These routes cover your selected simulation area",
+                f"💡 They will be tracked during simulation",
+                f"💡 Strategy used: {strategy}",
+                "="*70 + "\n"
+            ]))
         
         return created_routes
     
-    def _deactivate_old_routes(self, location_name: str):
-        """Deactivate old routes for this location"""
-        cursor = self.db.conn.cursor()
-        cursor.execute("""
-            UPDATE probe_routes 
-            SET active = 0 
-            WHERE route_id LIKE ?
-        """, (f"{location_name}%",))
-        self.db.conn.commit()
-    
-    def _save_bbox_info(self, bbox: Dict, location_name: str, routes: List[Dict]):
+    def _save_bbox_info(
+        self,
+        bbox: Dict,
+        location_name: str,
+        routes: List[Dict],
+        verbose: bool = True,
+        area_info: Dict = None
+    ):
         """Save bbox and route info to file"""
+        area_info = area_info or self.calculate_area_size(bbox)
         import os
         
         os.makedirs("data", exist_ok=True)
@@ -347,19 +287,21 @@ class AutoRouteGenerator:
             'timestamp': datetime.now().isoformat(),
             'num_routes': len(routes),
             'routes': routes,
-            'area_km2': self.calculate_area_size(bbox)['area_km2']
+            'area_km2': area_info['area_km2']
         }
         
+        # Encode once, write the same bytes to both files
+        payload = _dump_json_bytes(info)
+        
         # Save current bbox
-        with open("data/last_bbox.json", 'w') as f:
-            json.dump(info, f, indent=2)
+        Path("data/last_bbox.json").write_bytes(payload)
         
         # Also save with timestamp
         filename = f"data/bbox_{location_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w') as f:
-            json.dump(info, f, indent=2)
+        Path(filename).write_bytes(payload)
         
-        print(f"💾 Saved bbox info to: {filename}")
+        if verbose:
+            print(f"💾 Saved bbox info to: {filename}")
     
     def get_recommended_strategy(self, bbox: Dict) -> str:
         """
@@ -4,6 +4,7 @@ Compares simulation results with real-world traffic data
 Calculates accuracy metrics for thesis
 """
 import numpy as np
+from operator import attrgetter
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from modules.database import get_db
@@ -30,11 +31,40 @@ class ValidationMetrics:
     num_routes: int
     comparisons: List[ComparisonResult]
 
+# One CSV row per comparison, in export column order
+_CSV_ROW = attrgetter(
+    'route_id', 'route_name',
+    'real_travel_time', 'simulated_travel_time',
+    'absolute_error', 'percentage_error',
+    'real_samples', 'sim_samples'
+)
+
 class ComparisonEngine:
     """Compare simulation results with real-world data"""
     
     def __init__(self, db=None):
         self.db = db or get_db()
+        self._routes_cache = None
+        # (scenario_id, start_time, end_time) -> (db change count, metrics)
+        self._metrics_cache = {}
+    
+    def _get_routes_by_id(self) -> Dict[str, Dict]:
+        """Active probe routes keyed by route_id, loaded once per instance"""
+        if self._routes_cache is None:
+            self._routes_cache = {r['route_id']: r for r in self.db.get_probe_routes()}
+        return self._routes_cache
+    
+    def invalidate_routes_cache(self):
+        """Reload probe routes on next use (call after routes are added or changed)"""
+        self._routes_cache = None
+        self._metrics_cache.clear()
+    
+    def _get_cached_metrics(self, key: Tuple) -> Optional[ValidationMetrics]:
+        """Cached metrics for key, if nothing was written to the database since"""
+        entry = self._metrics_cache.get(key)
+        if entry and entry[0] == self.db.get_change_count():
+            return entry[1]
+        return None
     
     def get_real_data_average(
         self,
@@ -42,51 +72,20 @@ class ComparisonEngine:
         start_time: str = None,
         end_time: str = None
     ) -> Optional[Dict]:
-        """Get average real traffic data for a route"""
-        data = self.db.get_real_traffic_data(
-            route_id=route_id,
+        """Get average real traffic data for a route (aggregated in SQL)"""
+        return self.db.get_real_traffic_aggregates(
+            [route_id],
             start_time=start_time,
             end_time=end_time
-        )
-        
-        if not data:
-            return None
-        
-        travel_times = [d['travel_time_seconds'] for d in data]
-        speeds = [d['speed_kmh'] for d in data if d['speed_kmh']]
-        
-        return {
-            'avg_travel_time': np.mean(travel_times),
-            'std_travel_time': np.std(travel_times),
-            'min_travel_time': np.min(travel_times),
-            'max_travel_time': np.max(travel_times),
-            'avg_speed': np.mean(speeds) if speeds else None,
-            'sample_count': len(data)
-        }
+        ).get(route_id)
     
     def get_simulation_data_average(
         self,
         scenario_id: str,
         route_id: str
     ) -> Optional[Dict]:
-        """Get average simulation results for a route"""
-        data = self.db.get_simulation_results(
-            scenario_id=scenario_id,
-            route_id=route_id
-        )
-        
-        if not data:
-            return None
-        
-        travel_times = [d['travel_time_seconds'] for d in data]
-        
-        return {
-            'avg_travel_time': np.mean(travel_times),
-            'std_travel_time': np.std(travel_times),
-            'min_travel_time': np.min(travel_times),
-            'max_travel_time': np.max(travel_times),
-            'sample_count': len(data)
-        }
+        """Get average simulation results for a route (aggregated in SQL)"""
+        return self.db.get_simulation_aggregates(scenario_id, [route_id]).get(route_id)
     
     def compare_single_route(
         self,
@@ -98,8 +97,7 @@ class ComparisonEngine:
         """Compare simulation vs real data for a single route"""
         
         # Get route info
-        routes = self.db.get_probe_routes()
-        route_info = next((r for r in routes if r['route_id'] == route_id), None)
+        route_info = self._get_routes_by_id().get(route_id)
         if not route_info:
             return None
         
@@ -115,7 +113,10 @@ class ComparisonEngine:
             print(f"[COMPARISON] No simulation data for route {route_id}")
             return None
         
-        # Calculate errors
+        return self._build_comparison(route_info, real_data, sim_data)
+    
+    def _build_comparison(self, route_info: Dict, real_data: Dict, sim_data: Dict) -> ComparisonResult:
+        """Calculate errors between real and simulated averages for one route"""
         real_tt = real_data['avg_travel_time']
         sim_tt = sim_data['avg_travel_time']
         
@@ -123,7 +124,7 @@ class ComparisonEngine:
         pct_error = (abs_error / real_tt) * 100 if real_tt > 0 else 0
         
         return ComparisonResult(
-            route_id=route_id,
+            route_id=route_info['route_id'],
             route_name=route_info['name'],
             real_travel_time=real_tt,
             simulated_travel_time=sim_tt,
@@ -139,21 +140,66 @@ class ComparisonEngine:
         start_time: str = None,
         end_time: str = None
     ) -> List[ComparisonResult]:
-        """Compare all probe routes"""
-        routes = self.db.get_probe_routes(active_only=True)
-        results = []
+        """
+        Compare all probe routes
+        Only routes with both real and simulated data are aggregated, with
+        one query each instead of two queries per route
+        """
+        routes_by_id = self._get_routes_by_id()
+        ids_with_data = self.db.get_route_ids_with_data(scenario_id, start_time, end_time)
+        
+        routes = [r for r in routes_by_id.values() if r['route_id'] in ids_with_data]
+        skipped = len(routes_by_id) - len(routes)
+        if skipped:
+            print(f"[COMPARISON] Skipping {skipped} route(s) without both real and simulation data")
+        if not routes:
+            return []
+        
+        route_ids = [r['route_id'] for r in routes]
+        
+        real_aggregates = self.db.get_real_traffic_aggregates(route_ids, start_time, end_time)
+        sim_aggregates = self.db.get_simulation_aggregates(scenario_id, route_ids)
+        
+        matched = []
         
         for route in routes:
-            result = self.compare_single_route(
-                route['route_id'],
-                scenario_id,
-                start_time,
-                end_time
-            )
-            if result:
-                results.append(result)
+            route_id = route['route_id']
+            
+            real_data = real_aggregates.get(route_id)
+            if not real_data:
+                print(f"[COMPARISON] No real data for route {route_id}")
+                continue
+            
+            sim_data = sim_aggregates.get(route_id)
+            if not sim_data:
+                print(f"[COMPARISON] No simulation data for route {route_id}")
+                continue
+            
+            matched.append((route, real_data, sim_data))
+        
+        if not matched:
+            return []
+        
+        # Errors for all matched routes in one vectorized pass
+        real_arr = np.fromiter((m[1]['avg_travel_time'] for m in matched), dtype=np.float64, count=len(matched))
+        sim_arr = np.fromiter((m[2]['avg_travel_time'] for m in matched), dtype=np.float64, count=len(matched))
+        abs_err = np.abs(real_arr - sim_arr)
+        positive = real_arr > 0
+        pct_err = np.where(positive, abs_err / np.where(positive, real_arr, 1.0) * 100, 0.0)
         
-        return results
+        return [
+            ComparisonResult(
+                route_id=route['route_id'],
+                route_name=route['name'],
+                real_travel_time=real_data['avg_travel_time'],
+                simulated_travel_time=sim_data['avg_travel_time'],
+                absolute_error=abs_e,
+                percentage_error=pct_e,
+                real_samples=real_data['sample_count'],
+                sim_samples=sim_data['sample_count']
+            )
+            for (route, real_data, sim_data), abs_e, pct_e in zip(matched, abs_err.tolist(), pct_err.tolist())
+        ]
     
     def calculate_validation_metrics(
         self,
@@ -165,28 +211,46 @@ class ComparisonEngine:
         """
         Calculate overall validation metrics
         These are the KEY METRICS for your thesis!
+        
+        Results are cached per (scenario_id, start_time, end_time) until
+        the next database write, so report + export reuse one comparison.
         """
+        key = (scenario_id, start_time, end_time)
+        metrics = self._get_cached_metrics(key)
+        if metrics is not None:
+            if save_to_db:
+                self._save_metrics(scenario_id, metrics, start_time, end_time)
+                self._metrics_cache[key] = (self.db.get_change_count(), metrics)
+            return metrics
+        
         comparisons = self.compare_all_routes(scenario_id, start_time, end_time)
         
         if not comparisons:
             raise ValueError("No comparisons available - need both real and simulation data")
         
-        # Extract arrays for calculations
-        real_values = np.array([c.real_travel_time for c in comparisons])
-        sim_values = np.array([c.simulated_travel_time for c in comparisons])
+        # Real and simulated travel times, each filled straight into its own
+        # contiguous float64 vector (no intermediate list or copy)
+        n = len(comparisons)
+        real_values = np.fromiter((c.real_travel_time for c in comparisons), dtype=np.float64, count=n)
+        sim_values = np.fromiter((c.simulated_travel_time for c in comparisons), dtype=np.float64, count=n)
+        
+        # Residuals computed once and reused by every metric
+        diff = real_values - sim_values
+        abs_diff = np.abs(diff)
+        ss_res = np.dot(diff, diff)
         
         # Calculate MAE (Mean Absolute Error)
-        mae = np.mean(np.abs(real_values - sim_values))
+        mae = abs_diff.mean()
         
         # Calculate RMSE (Root Mean Squared Error)
-        rmse = np.sqrt(np.mean((real_values - sim_values) ** 2))
+        rmse = np.sqrt(ss_res / len(diff))
         
         # Calculate MAPE (Mean Absolute Percentage Error)
-        mape = np.mean(np.abs((real_values - sim_values) / real_values)) * 100
+        mape = (abs_diff / real_values).mean() * 100
         
         # Calculate R-squared
-        ss_res = np.sum((real_values - sim_values) ** 2)
-        ss_tot = np.sum((real_values - np.mean(real_values)) ** 2)
+        real_centered = real_values - real_values.mean()
+        ss_tot = np.dot(real_centered, real_centered)
         r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
         
         metrics = ValidationMetrics(
@@ -200,31 +264,44 @@ class ComparisonEngine:
         
         # Save to database
         if save_to_db:
-            self.db.store_validation_metrics(
-                scenario_id=scenario_id,
-                mae=mae,
-                rmse=rmse,
-                mape=mape,
-                r_squared=r_squared,
-                num_samples=len(comparisons),
-                time_period_start=start_time,
-                time_period_end=end_time
-            )
+            self._save_metrics(scenario_id, metrics, start_time, end_time)
         
+        self._metrics_cache[key] = (self.db.get_change_count(), metrics)
         return metrics
     
+    def _save_metrics(
+        self,
+        scenario_id: str,
+        metrics: ValidationMetrics,
+        start_time: str = None,
+        end_time: str = None
+    ):
+        """Store validation metrics for a scenario"""
+        self.db.store_validation_metrics(
+            scenario_id=scenario_id,
+            mae=metrics.mae,
+            rmse=metrics.rmse,
+            mape=metrics.mape,
+            r_squared=metrics.r_squared,
+            num_samples=metrics.num_routes,
+            time_period_start=start_time,
+            time_period_end=end_time
+        )
+    
     def print_comparison_report(
         self,
         scenario_id: str,
         start_time: str = None,
         end_time: str = None
     ):
-        """Print detailed comparison report"""
-        print("\n" + "="*70)
-        print("DIGITAL TWIN VALIDATION REPORT")
-        print("="*70)
-        print(f"Scenario: {scenario_id}")
-        print()
+        """Print detailed comparison report (built up and written in one call)"""
+        lines = [
+            "\n" + "="*70,
+            "DIGITAL TWIN VALIDATION REPORT",
+            "="*70,
+            f"Scenario: {scenario_id}",
+            ""
+        ]
         
         try:
             metrics = self.calculate_validation_metrics(
@@ -235,18 +312,18 @@ class ComparisonEngine:
             )
             
             # Overall metrics
-            print("OVERALL ACCURACY METRICS:")
-            print("-" * 70)
-            print(f"  Mean Absolute Error (MAE):       {metrics.mae:.2f} seconds ({metrics.mae/60:.2f} min)")
-            print(f"  Root Mean Squared Error (RMSE):  {metrics.rmse:.2f} seconds ({metrics.rmse/60:.2f} min)")
-            print(f"  Mean Absolute % Error (MAPE):    {metrics.mape:.2f}%")
-            print(f"  R-squared (correlation):         {metrics.r_squared:.4f}")
-            print(f"  Routes compared:                 {metrics.num_routes}")
-            print()
+            lines += [
+                "OVERALL ACCURACY METRICS:",
+                "-" * 70,
+                f"  Mean Absolute Error (MAE):       {metrics.mae:.2f} seconds ({metrics.mae/60:.2f} min)",
+                f"  Root Mean Squared Error (RMSE):  {metrics.rmse:.2f} seconds ({metrics.rmse/60:.2f} min)",
+                f"  Mean Absolute % Error (MAPE):    {metrics.mape:.2f}%",
+                f"  R-squared (correlation):         {metrics.r_squared:.4f}",
+                f"  Routes compared:                 {metrics.num_routes}",
+                ""
+            ]
             
             # Interpret results
-            print("INTERPRETATION:")
-            print("-" * 70)
             if metrics.mape < 10:
                 accuracy = "Excellent (< 10%)"
             elif metrics.mape < 20:
@@ -256,8 +333,6 @@ class ComparisonEngine:
             else:
                 accuracy = "Needs Calibration (> 30%)"
             
-            print(f"  Accuracy Level: {accuracy}")
-            
             if metrics.r_squared > 0.9:
                 correlation = "Very Strong (> 0.9)"
             elif metrics.r_squared > 0.7:
@@ -267,48 +342,64 @@ class ComparisonEngine:
             else:
                 correlation = "Weak (< 0.5)"
             
-            print(f"  Correlation: {correlation}")
-            print()
+            lines += [
+                "INTERPRETATION:",
+                "-" * 70,
+                f"  Accuracy Level: {accuracy}",
+                f"  Correlation: {correlation}",
+                ""
+            ]
             
             # Per-route comparison
-            print("PER-ROUTE COMPARISON:")
-            print("-" * 70)
-            print(f"{'Route':<35} {'Real':<12} {'Simulated':<12} {'Error':<12}")
-            print("-" * 70)
-            
-            for comp in metrics.comparisons:
-                real_min = comp.real_travel_time / 60
-                sim_min = comp.simulated_travel_time / 60
-                error_pct = comp.percentage_error
-                
-                print(f"{comp.route_name[:34]:<35} {real_min:>10.1f}m {sim_min:>10.1f}m {error_pct:>10.1f}%")
-            
-            print("="*70)
+            lines += [
+                "PER-ROUTE COMPARISON:",
+                "-" * 70,
+                f"{'Route':<35} {'Real':<12} {'Simulated':<12} {'Error':<12}",
+                "-" * 70
+            ]
+            lines += [
+                f"{comp.route_name[:34]:<35} {comp.real_travel_time / 60:>10.1f}m "
+                f"{comp.simulated_travel_time / 60:>10.1f}m {comp.percentage_error:>10.1f}%"
+                for comp in metrics.comparisons
+            ]
+            lines.append("="*70)
             
             # Recommendations
-            print("\nRECOMMENDATIONS:")
+            lines.append("\nRECOMMENDATIONS:")
             if metrics.mape > 20:
-                print("  ⚠️  Consider calibration to improve accuracy")
-                print("  ⚠️  Check SUMO parameters: car-following model, speed limits, lane changing")
+                lines.append("  ⚠️  Consider calibration to improve accuracy")
+                lines.append("  ⚠️  Check SUMO parameters: car-following model, speed limits, lane changing")
             elif metrics.mape < 15:
-                print("  ✅ Digital twin accuracy is good for practical use")
-                print("  ✅ Suitable for prediction and scenario testing")
+                lines.append("  ✅ Digital twin accuracy is good for practical use")
+                lines.append("  ✅ Suitable for prediction and scenario testing")
             
-            print()
+            lines.append("")
+            print("\n".join(lines))
             
             return metrics
             
         except Exception as e:
+            print("\n".join(lines))
             print(f"❌ Error generating report: {e}")
             import traceback
             traceback.print_exc()
             return None
     
-    def export_comparison_csv(self, scenario_id: str, output_path: str):
-        """Export comparison data to CSV for thesis charts"""
+    def export_comparison_csv(
+        self,
+        scenario_id: str,
+        output_path: str,
+        metrics: ValidationMetrics = None
+    ):
+        """
+        Export comparison data to CSV for thesis charts
+        Pass metrics (e.g. from print_comparison_report) to reuse its comparisons
+        """
         import csv
         
-        comparisons = self.compare_all_routes(scenario_id)
+        if metrics is None:
+            metrics = self._get_cached_metrics((scenario_id, None, None))
+        comparisons = metrics.comparisons if metrics else self.compare_all_routes(scenario_id)
         
         with open(output_path, 'w', newline='') as f:
             writer = csv.writer(f)
@@ -319,16 +410,6 @@ class ComparisonEngine:
                 'Real Samples', 'Simulation Samples'
             ])
             
-            for comp in comparisons:
-                writer.writerow([
-                    comp.route_id,
-                    comp.route_name,
-                    comp.real_travel_time,
-                    comp.simulated_travel_time,
-                    comp.absolute_error,
-                    comp.percentage_error,
-                    comp.real_samples,
-                    comp.sim_samples
-                ])
+            writer.writerows(map(_CSV_ROW, comparisons))
         
         print(f"[COMPARISON] Exported to {output_path}")
\ No newline at end of file
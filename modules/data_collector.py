@@ -2,29 +2,116 @@
 Real Traffic Data Collector
 Fetches current traffic conditions from Google Maps API
 """
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from modules.database import get_db
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
 class TrafficDataCollector:
     """Collects real-world traffic data via Google Maps API"""
+
+    # Distance Matrix API per-request origin/destination limit
+    MATRIX_MAX_LOCATIONS = 25
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, store_raw: bool = False):
+        """
+        Args:
+            api_key: Google Maps API key
+            store_raw: Keep the full API response on results and in the
+                raw_data column. Off by default: a Directions response with
+                polyline and steps is tens of KB against the four numeric
+                columns actually used.
+        """
         self.api_key = api_key
+        self.store_raw = store_raw
         self.base_url = "https://maps.googleapis.com/maps/api/directions/json"
+        self.matrix_url = "https://maps.googleapis.com/maps/api/distancematrix/json"
         self.db = get_db()
+        
+        # Persistent session so the TLS connection is reused across requests
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=16))
+        self.session.headers.update({'Accept-Encoding': 'gzip'})
+        
         self.last_request_time = 0
         self.min_request_interval = 1.0  # Rate limiting: 1 request per second
+        self._rate_lock = threading.Lock()
+        
+        # Short-lived result cache keyed on (rounded OD coordinates, time bucket)
+        self.cache_ttl_seconds = 60
+        self.cache_max_size = 4096
+        self._traffic_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def close(self):
+        """Close the pooled HTTP connections"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _cache_key(self, origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float) -> Tuple:
+        """Cache key for an OD pair within the current time bucket"""
+        return (
+            round(origin_lat, 6), round(origin_lon, 6),
+            round(dest_lat, 6), round(dest_lon, 6),
+            int(time.time() // self.cache_ttl_seconds)
+        )
+    
+    def _cache_get(self, key: Tuple) -> Optional[Dict]:
+        """Return a cached result (LRU touch) or None"""
+        with self._cache_lock:
+            result = self._traffic_cache.get(key)
+            if result is not None:
+                self._traffic_cache.move_to_end(key)
+            return result
+    
+    def _cache_put(self, key: Tuple, result: Dict):
+        """Cache a result, evicting the least recently used entries"""
+        with self._cache_lock:
+            self._traffic_cache[key] = result
+            self._traffic_cache.move_to_end(key)
+            while len(self._traffic_cache) > self.cache_max_size:
+                self._traffic_cache.popitem(last=False)
     
     def _rate_limit(self):
-        """Ensure we don't exceed API rate limits"""
-        now = time.time()
-        time_since_last = now - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last)
-        self.last_request_time = time.time()
+        """
+        Ensure we don't exceed API rate limits
+        Thread-safe: each caller reserves the next free request slot under
+        the lock and sleeps outside it, so concurrent workers stay spaced
+        by min_request_interval while their HTTP round-trips overlap.
+        """
+        delay = self._reserve_request_slot()
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def _rate_limit_async(self):
+        """Event-loop variant of _rate_limit (shares the same request slots)"""
+        delay = self._reserve_request_slot()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _reserve_request_slot(self) -> float:
+        """Claim the next free request slot; returns seconds to wait for it"""
+        with self._rate_lock:
+            slot = max(time.time(), self.last_request_time + self.min_request_interval)
+            self.last_request_time = slot
+        return slot - time.time()
     
     def fetch_route_traffic(
         self,
@@ -41,8 +128,19 @@ class TrafficDataCollector:
         - travel_time_seconds: current travel time
         - distance_meters: route distance
         - traffic_delay_seconds: delay due to traffic (vs free-flow)
-        - speed_kmh: average speed
+        - speed_kmh: average speed (full precision; round for display)
+        - raw_response: full API response (only when store_raw is set)
+        
+        Repeated queries for the same OD pair within the cache time bucket
+        return the cached result without an API call. Only fetched results
+        are stored: a cache hit is the same measurement, and storing it
+        again would duplicate real_traffic_data rows.
         """
+        cache_key = self._cache_key(origin_lat, origin_lon, dest_lat, dest_lon)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         self._rate_limit()
         
         origin = f"{origin_lat},{origin_lon}"
@@ -57,7 +155,7 @@ class TrafficDataCollector:
         }
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
+            response = self.session.get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -66,43 +164,12 @@ class TrafficDataCollector:
                 return None
             
             route = data['routes'][0]['legs'][0]
-            
-            # Extract data
-            distance_meters = route['distance']['value']
-            duration_seconds = route['duration']['value']
-            
-            # Duration in traffic (with current conditions)
-            if 'duration_in_traffic' in route:
-                traffic_duration = route['duration_in_traffic']['value']
-                traffic_delay = traffic_duration - duration_seconds
-            else:
-                traffic_duration = duration_seconds
-                traffic_delay = 0
-            
-            # Calculate average speed
-            speed_kmh = (distance_meters / 1000) / (traffic_duration / 3600) if traffic_duration > 0 else 0
-            
-            result = {
-                'travel_time_seconds': traffic_duration,
-                'distance_meters': distance_meters,
-                'traffic_delay_seconds': traffic_delay,
-                'speed_kmh': round(speed_kmh, 2),
-                'timestamp': datetime.now().isoformat(),
-                'raw_response': data
-            }
+            result = self._parse_leg(route, data)
+            self._cache_put(cache_key, result)
             
             # Store in database if route_id provided
             if route_id:
-                self.db.store_real_traffic_data(
-                    route_id=route_id,
-                    travel_time_seconds=traffic_duration,
-                    distance_meters=distance_meters,
-                    traffic_delay_seconds=traffic_delay,
-                    speed_kmh=speed_kmh,
-                    data_source='google_maps',
-                    raw_data=data
-                )
-                print(f"[COLLECTOR] Stored data for route: {route_id}")
+                self._store_result(route_id, result)
             
             return result
             
@@ -113,9 +180,227 @@ class TrafficDataCollector:
             print(f"[COLLECTOR] Error: {e}")
             return None
     
-    def collect_all_probe_routes(self) -> Dict[str, Dict]:
+    async def fetch_route_traffic_async(
+        self,
+        session,
+        origin_lat: float,
+        origin_lon: float,
+        dest_lat: float,
+        dest_lon: float
+    ) -> Optional[Dict]:
+        """
+        Async variant of fetch_route_traffic using an aiohttp.ClientSession
+        Shares the result cache and rate limit; results are not stored.
+        """
+        cache_key = self._cache_key(origin_lat, origin_lon, dest_lat, dest_lon)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        await self._rate_limit_async()
+        
+        params = {
+            'origin': f"{origin_lat},{origin_lon}",
+            'destination': f"{dest_lat},{dest_lon}",
+            'mode': 'driving',
+            'departure_time': 'now',  # Get current traffic
+            'key': self.api_key
+        }
+        
+        try:
+            async with session.get(self.base_url, params=params) as response:
+                response.raise_for_status()
+                data = await response.json()
+            
+            if data['status'] != 'OK':
+                print(f"[COLLECTOR] API Error: {data['status']}")
+                return None
+            
+            result = self._parse_leg(data['routes'][0]['legs'][0], data)
+            self._cache_put(cache_key, result)
+            return result
+            
+        except aiohttp.ClientError as e:
+            print(f"[COLLECTOR] Network error: {e}")
+            return None
+        except Exception as e:
+            print(f"[COLLECTOR] Error: {e}")
+            return None
+    
+    def _parse_leg(self, leg: Dict, raw_response: Dict) -> Dict:
+        """
+        Build a traffic result from a Directions leg or Distance Matrix element
+        (both carry distance, duration and duration_in_traffic)
+        """
+        distance_meters = leg['distance']['value']
+        duration_seconds = leg['duration']['value']
+        
+        # Duration in traffic (with current conditions)
+        if 'duration_in_traffic' in leg:
+            traffic_duration = leg['duration_in_traffic']['value']
+            traffic_delay = traffic_duration - duration_seconds
+        else:
+            traffic_duration = duration_seconds
+            traffic_delay = 0
+        
+        # Calculate average speed
+        speed_kmh = (distance_meters / 1000) / (traffic_duration / 3600) if traffic_duration > 0 else 0
+        
+        result = {
+            'travel_time_seconds': traffic_duration,
+            'distance_meters': distance_meters,
+            'traffic_delay_seconds': traffic_delay,
+            'speed_kmh': speed_kmh,
+            'timestamp': datetime.now().isoformat()
+        }
+        if self.store_raw:
+            result['raw_response'] = raw_response
+        return result
+    
+    def _matrix_chunks(
+        self,
+        origins: List[Tuple[float, float]],
+        destinations: List[Tuple[float, float]]
+    ):
+        """
+        Group pair indices by shared origin, up to MATRIX_MAX_LOCATIONS
+        destinations per group, for one-origin Distance Matrix requests
+
+        The API bills every origin x destination element, so a request
+        only ever asks for elements that belong to a wanted pair.
+        """
+        by_origin = {}
+        for k, origin in enumerate(origins):
+            by_origin.setdefault(origin, []).append(k)
+
+        for indices in by_origin.values():
+            chunk, chunk_dests = [], set()
+            for k in indices:
+                dest = destinations[k]
+                if dest not in chunk_dests and len(chunk_dests) >= self.MATRIX_MAX_LOCATIONS:
+                    yield chunk
+                    chunk, chunk_dests = [], set()
+                chunk.append(k)
+                chunk_dests.add(dest)
+            if chunk:
+                yield chunk
+
+    def fetch_route_traffic_batch(
+        self,
+        origins: List[Tuple[float, float]],
+        destinations: List[Tuple[float, float]],
+        progress_callback=None
+    ) -> List[Optional[Dict]]:
+        """
+        Fetch current traffic conditions for paired routes
+        origins[k] -> destinations[k] using the Distance Matrix API
+        
+        Pairs sharing an origin go in one request (see _matrix_chunks),
+        and pairs still in the result cache are not requested at all.
+        Results are not stored in the database.
+        
+        Args:
+            progress_callback: Optional callback function(done, total)
+                called after each request with the number of pairs handled
+        
+        Returns list aligned with the input pairs (None where a pair failed)
+        """
+        origins = [(float(lat), float(lon)) for lat, lon in origins]
+        destinations = [(float(lat), float(lon)) for lat, lon in destinations]
+        results = [None] * len(origins)
+        
+        cache_keys = [
+            self._cache_key(o[0], o[1], d[0], d[1])
+            for o, d in zip(origins, destinations)
+        ]
+        pending = []
+        for k, key in enumerate(cache_keys):
+            results[k] = self._cache_get(key)
+            if results[k] is None:
+                pending.append(k)
+        
+        pending_origins = [origins[k] for k in pending]
+        pending_dests = [destinations[k] for k in pending]
+        
+        done = len(origins) - len(pending)
+        for pending_chunk in self._matrix_chunks(pending_origins, pending_dests):
+            chunk = [pending[p] for p in pending_chunk]
+            origin_index = {}
+            dest_index = {}
+            for k in chunk:
+                origin_index.setdefault(origins[k], len(origin_index))
+                dest_index.setdefault(destinations[k], len(dest_index))
+            
+            self._rate_limit()
+            
+            params = {
+                'origins': '|'.join(f"{lat},{lon}" for lat, lon in origin_index),
+                'destinations': '|'.join(f"{lat},{lon}" for lat, lon in dest_index),
+                'mode': 'driving',
+                'departure_time': 'now',  # Get current traffic
+                'key': self.api_key
+            }
+            
+            try:
+                response = self.session.get(self.matrix_url, params=params, timeout=10)
+                response.raise_for_status()
+                data = response.json()
+                
+                if data['status'] != 'OK':
+                    print(f"[COLLECTOR] Distance Matrix API Error: {data['status']}")
+                else:
+                    rows = data['rows']
+                    for k in chunk:
+                        element = rows[origin_index[origins[k]]]['elements'][dest_index[destinations[k]]]
+                        if element.get('status') == 'OK':
+                            results[k] = self._parse_leg(element, element)
+                            self._cache_put(cache_keys[k], results[k])
+                
+            except requests.RequestException as e:
+                print(f"[COLLECTOR] Network error: {e}")
+            except Exception as e:
+                print(f"[COLLECTOR] Error: {e}")
+            
+            done += len(chunk)
+            if progress_callback:
+                progress_callback(done, len(origins))
+        
+        return results
+    
+    def _store_result(self, route_id: str, result: Dict):
+        """Persist a fetched result as a real traffic sample"""
+        self.db.store_real_traffic_data(
+            route_id=route_id,
+            travel_time_seconds=result['travel_time_seconds'],
+            distance_meters=result['distance_meters'],
+            traffic_delay_seconds=result['traffic_delay_seconds'],
+            speed_kmh=result['speed_kmh'],
+            data_source='google_maps',
+            raw_data=result.get('raw_response')
+        )
+        print(f"[COLLECTOR] Stored data for route: {route_id}")
+    
+    def _store_results_bulk(self, results: Dict[str, Dict]):
+        """Persist fetched results for many routes in one transaction"""
+        if not results:
+            return
+        self.db.store_real_traffic_data_bulk([
+            (route_id, result['timestamp'], result['travel_time_seconds'],
+             result['distance_meters'], result['traffic_delay_seconds'],
+             result['speed_kmh'], 'google_maps', result.get('raw_response'))
+            for route_id, result in results.items()
+        ])
+        print(f"[COLLECTOR] Stored data for {len(results)} routes")
+    
+    def collect_all_probe_routes(self, max_workers: int = 5) -> Dict[str, Dict]:
         """
         Collect traffic data for all active probe routes
+        
+        Requests run on a bounded thread pool (still paced by _rate_limit);
+        results are stored afterwards from the calling thread in one
+        transaction, so the shared SQLite connection is never written
+        concurrently.
+        
         Returns dict mapping route_id to traffic data
         """
         routes = self.db.get_probe_routes(active_only=True)
@@ -127,23 +412,77 @@ class TrafficDataCollector:
         print(f"[COLLECTOR] Collecting data for {len(routes)} routes...")
         results = {}
         
-        for route in routes:
-            print(f"[COLLECTOR] Fetching: {route['name']}")
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(
+                    self.fetch_route_traffic,
+                    route['origin_lat'], route['origin_lon'],
+                    route['dest_lat'], route['dest_lon']
+                ): route
+                for route in routes
+            }
+            
+            for future in as_completed(futures):
+                route = futures[future]
+                data = future.result()
+                print(f"[COLLECTOR] Fetched: {route['name']}")
+                
+                if data:
+                    results[route['route_id']] = data
+                    print(f"  ✓ {data['travel_time_seconds']}s, {data['speed_kmh']:.2f} km/h")
+                else:
+                    print(f"  ✗ Failed to fetch data")
+        
+        self._store_results_bulk(results)
+        return results
+    
+    async def collect_all_probe_routes_async(self, max_concurrency: int = 10) -> Dict[str, Dict]:
+        """
+        Collect traffic data for all active probe routes on the event loop
+        
+        All requests share one aiohttp session and overlap their waits
+        (bounded by max_concurrency, still paced by the rate limit).
+        Results are stored in one transaction once gathered.
+        Falls back to the thread-pool collector if aiohttp is not installed.
+        
+        Returns dict mapping route_id to traffic data
+        """
+        if aiohttp is None:
+            print("[COLLECTOR] aiohttp not installed, using thread pool collector")
+            return await asyncio.to_thread(self.collect_all_probe_routes)
+        
+        routes = self.db.get_probe_routes(active_only=True)
+        
+        if not routes:
+            print("[COLLECTOR] No probe routes defined!")
+            return {}
+        
+        print(f"[COLLECTOR] Collecting data for {len(routes)} routes...")
+        semaphore = asyncio.Semaphore(max_concurrency)
+        timeout = aiohttp.ClientTimeout(total=10)
+        
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async def fetch(route):
+                async with semaphore:
+                    return await self.fetch_route_traffic_async(
+                        session,
+                        route['origin_lat'], route['origin_lon'],
+                        route['dest_lat'], route['dest_lon']
+                    )
             
-            data = self.fetch_route_traffic(
-                origin_lat=route['origin_lat'],
-                origin_lon=route['origin_lon'],
-                dest_lat=route['dest_lat'],
-                dest_lon=route['dest_lon'],
-                route_id=route['route_id']
-            )
+            fetched = await asyncio.gather(*(fetch(route) for route in routes))
+        
+        results = {}
+        for route, data in zip(routes, fetched):
+            print(f"[COLLECTOR] Fetched: {route['name']}")
             
             if data:
                 results[route['route_id']] = data
-                print(f"  ✓ {data['travel_time_seconds']}s, {data['speed_kmh']} km/h")
+                print(f"  ✓ {data['travel_time_seconds']}s, {data['speed_kmh']:.2f} km/h")
             else:
                 print(f"  ✗ Failed to fetch data")
         
+        self._store_results_bulk(results)
         return results
     
     def start_continuous_collection(
@@ -164,6 +503,8 @@ class TrafficDataCollector:
         
         start_time = time.time()
         collection_count = 0
+        interval_seconds = interval_minutes * 60
+        next_deadline = time.monotonic()
         
         try:
             while True:
@@ -179,9 +520,18 @@ class TrafficDataCollector:
                         print(f"\n[COLLECTOR] Completed {duration_hours} hours of collection")
                         break
                 
-                # Wait for next collection
-                print(f"[COLLECTOR] Waiting {interval_minutes} minutes until next collection...")
-                time.sleep(interval_minutes * 60)
+                # Wait for next collection (deadlines are absolute, so
+                # collection time does not accumulate as drift)
+                next_deadline += interval_seconds
+                now = time.monotonic()
+                if now > next_deadline:
+                    missed = int((now - next_deadline) // interval_seconds) + 1
+                    next_deadline += missed * interval_seconds
+                    print(f"[COLLECTOR] ⚠️  Collection overran the interval, skipping {missed} slot(s)")
+                
+                wait_seconds = next_deadline - now
+                print(f"[COLLECTOR] Waiting {wait_seconds / 60:.1f} minutes until next collection...")
+                time.sleep(wait_seconds)
                 
         except KeyboardInterrupt:
             print(f"\n[COLLECTOR] Stopped by user after {collection_count} collections")
@@ -199,32 +549,31 @@ class TrafficDataAnalyzer:
         end_time: str = None
     ) -> Dict:
         """Calculate statistics for a route"""
-        data = self.db.get_real_traffic_data(
+        columns = self.db.get_real_traffic_data_columns(
             route_id=route_id,
             start_time=start_time,
             end_time=end_time
         )
         
-        if not data:
+        travel_times = columns['travel_time_seconds']
+        if not travel_times.size:
             return {}
         
-        travel_times = [d['travel_time_seconds'] for d in data]
-        speeds = [d['speed_kmh'] for d in data if d['speed_kmh']]
-        
-        import statistics
+        speeds = columns['speed_kmh']
+        speeds = speeds[(speeds != 0) & ~np.isnan(speeds)]
         
         stats = {
-            'count': len(data),
-            'avg_travel_time': statistics.mean(travel_times),
-            'min_travel_time': min(travel_times),
-            'max_travel_time': max(travel_times),
-            'std_travel_time': statistics.stdev(travel_times) if len(travel_times) > 1 else 0,
+            'count': int(travel_times.size),
+            'avg_travel_time': float(travel_times.mean()),
+            'min_travel_time': float(travel_times.min()),
+            'max_travel_time': float(travel_times.max()),
+            'std_travel_time': float(travel_times.std(ddof=1)) if travel_times.size > 1 else 0,
         }
         
-        if speeds:
-            stats['avg_speed'] = statistics.mean(speeds)
-            stats['min_speed'] = min(speeds)
-            stats['max_speed'] = max(speeds)
+        if speeds.size:
+            stats['avg_speed'] = float(speeds.mean())
+            stats['min_speed'] = float(speeds.min())
+            stats['max_speed'] = float(speeds.max())
         
         return stats
     
@@ -4,26 +4,595 @@ Stores real traffic data, simulation results, and comparison metrics
 """
 import sqlite3
 import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import numpy as np
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import chain
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Nothing here prints: routine per-call messages log at debug so write
+# loops don't pay for them, schema migrations and archiving at info/warning
+logger = logging.getLogger(__name__)
+
+# Per-connection PRAGMAs. WAL + relaxed sync: commits in write-heavy loops
+# (collection, calibration) no longer fsync the rollback journal every
+# time, and readers are not blocked by an in-progress write.
+CONNECTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,   # 256 MB
+    'cache_size': -65536,     # 64 MB page cache (negative = KiB)
+    'busy_timeout': 5000,     # ms to wait on a locked database
+}
+
+# Overrides for one-off bulk import scripts (unsafe_fast=True): no fsync
+# and an in-memory journal, so a crash mid-import can corrupt the file.
+# foreign_keys stays off: area samples store snapshot_id as route_id.
+UNSAFE_FAST_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+}
+
+# Local-time ISO-8601 timestamp computed by SQLite (millisecond precision),
+# so hot-path inserts don't build a datetime and string per row in Python
+_SQL_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')"
+
+# Hot-path INSERTs. Kept as constants so every call passes the identical
+# string and hits the connection's prepared-statement cache.
+# {to_json} wraps JSON payloads: 'jsonb' where the linked SQLite stores
+# binary JSONB (3.45+), '' (plain JSON text) otherwise - see connect().
+_SQL_INSERT_REAL_TRAFFIC = """
+    INSERT INTO real_traffic_data
+    (route_id, timestamp, travel_time_seconds, distance_meters,
+     traffic_delay_seconds, speed_kmh, data_source, raw_data)
+    VALUES (?, COALESCE(?, """ + _SQL_NOW + """), ?, ?, ?, ?, ?, {to_json}(?))
+"""
+
+_SQL_INSERT_SIM_RESULT = """
+    INSERT INTO simulation_results
+    (scenario_id, route_id, timestamp, travel_time_seconds,
+     distance_meters, avg_speed_kmh, num_vehicles, simulation_params)
+    VALUES (?, ?, COALESCE(?, """ + _SQL_NOW + """), ?, ?, ?, ?, {to_json}(?))
+"""
+
+# Explicit column lists for reads; {from_json} ('json' or '') turns JSONB
+# payloads back into JSON text. *_FIELDS give the same order by name.
+_REAL_TRAFFIC_FIELDS = (
+    'id', 'route_id', 'area_id', 'timestamp', 'travel_time_seconds', 'distance_meters',
+    'traffic_delay_seconds', 'speed_kmh', 'data_source', 'raw_data',
+    'origin_lat', 'origin_lon', 'dest_lat', 'dest_lon'
+)
+
+_SIM_RESULT_FIELDS = (
+    'id', 'scenario_id', 'route_id', 'timestamp', 'travel_time_seconds', 'distance_meters',
+    'avg_speed_kmh', 'num_vehicles', 'simulation_params'
+)
+
+_REAL_TRAFFIC_COLUMNS = """
+    id, route_id, area_id, timestamp, travel_time_seconds, distance_meters,
+    traffic_delay_seconds, speed_kmh, data_source, {from_json}(raw_data) AS raw_data,
+    origin_lat, origin_lon, dest_lat, dest_lon
+"""
+
+def _dump_json(obj) -> str:
+    """Encode a payload as JSON text, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    return json.dumps(obj)
+
+
+_load_json = orjson.loads if orjson is not None else json.loads
+
+# Columns holding JSON payloads (text or JSONB)
+_JSON_PAYLOAD_COLUMNS = ('raw_data', 'simulation_params')
+
+# Large tables whose row counts are kept in row_counters by triggers
+_COUNTED_TABLES = ('real_traffic_data', 'simulation_results', 'area_traffic_snapshots')
+
+_SIM_RESULT_COLUMNS = """
+    id, scenario_id, route_id, timestamp, travel_time_seconds, distance_meters,
+    avg_speed_kmh, num_vehicles, {from_json}(simulation_params) AS simulation_params
+"""
+
+_SQL_INSERT_AREA_SAMPLE = """
+    INSERT INTO real_traffic_data
+    (route_id, area_id, timestamp, travel_time_seconds, distance_meters,
+     speed_kmh, data_source, origin_lat, origin_lon, dest_lat, dest_lon)
+    VALUES (?, ?, """ + _SQL_NOW + """, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Refreshing an existing probe route updates it in place, keeping its
+# rowid, created_at and area link (INSERT OR REPLACE deleted and
+# re-inserted the row); re-adding a route also reactivates it
+_SQL_UPSERT_PROBE_ROUTE = """
+    INSERT INTO probe_routes
+    (route_id, name, origin_lat, origin_lon, dest_lat, dest_lon,
+     description, created_at, is_primary, priority)
+    VALUES (?, ?, ?, ?, ?, ?, ?, """ + _SQL_NOW + """, ?, ?)
+    ON CONFLICT(route_id) DO UPDATE SET
+        name = excluded.name,
+        origin_lat = excluded.origin_lat,
+        origin_lon = excluded.origin_lon,
+        dest_lat = excluded.dest_lat,
+        dest_lon = excluded.dest_lon,
+        description = excluded.description,
+        is_primary = excluded.is_primary,
+        priority = excluded.priority,
+        active = 1
+"""
+
+_SQL_INSERT_VALIDATION = """
+    INSERT INTO validation_metrics
+    (scenario_id, timestamp, mae, rmse, mape, r_squared,
+     num_samples, time_period_start, time_period_end, notes)
+    VALUES (?, """ + _SQL_NOW + """, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Bump when SCHEMA_SQL or the trigger setup in create_tables changes.
+# Stored in PRAGMA user_version (1 marked the old JSONB conversion).
+SCHEMA_VERSION = 5
+
+SCHEMA_SQL = """
+    -- NEW TABLE: Monitored Areas (fixed geographic areas for training)
+    CREATE TABLE IF NOT EXISTS monitored_areas (
+        area_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        bbox_north REAL NOT NULL,
+        bbox_south REAL NOT NULL,
+        bbox_east REAL NOT NULL,
+        bbox_west REAL NOT NULL,
+        sumo_network_file TEXT,
+        status TEXT DEFAULT 'created',
+        training_start_date TEXT,
+        training_end_date TEXT,
+        training_duration_days INTEGER,
+        collections_completed INTEGER DEFAULT 0,
+        collections_target INTEGER,
+        accuracy_rmse REAL,
+        accuracy_mae REAL,
+        accuracy_mape REAL,
+        created_at TEXT NOT NULL,
+        last_snapshot_ts TEXT,
+        last_avg_speed_kmh REAL,
+        samples_count INTEGER DEFAULT 0
+    );
+
+    -- Table 1: Probe Routes (routes we monitor)
+    CREATE TABLE IF NOT EXISTS probe_routes (
+        route_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        origin_lat REAL NOT NULL,
+        origin_lon REAL NOT NULL,
+        dest_lat REAL NOT NULL,
+        dest_lon REAL NOT NULL,
+        description TEXT,
+        created_at TEXT NOT NULL,
+        active INTEGER DEFAULT 1,
+        is_primary INTEGER DEFAULT 0,
+        priority INTEGER DEFAULT 0,
+        area_id TEXT,
+        FOREIGN KEY (area_id) REFERENCES monitored_areas(area_id)
+    );
+
+    -- Table 2: Real Traffic Data (from APIs)
+    CREATE TABLE IF NOT EXISTS real_traffic_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        route_id TEXT,
+        area_id TEXT,
+        timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')),
+        travel_time_seconds INTEGER NOT NULL,
+        distance_meters INTEGER NOT NULL,
+        traffic_delay_seconds INTEGER,
+        speed_kmh REAL,
+        data_source TEXT NOT NULL,
+        raw_data BLOB,
+        origin_lat REAL,
+        origin_lon REAL,
+        dest_lat REAL,
+        dest_lon REAL,
+        FOREIGN KEY (route_id) REFERENCES probe_routes (route_id),
+        FOREIGN KEY (area_id) REFERENCES monitored_areas (area_id)
+    );
+
+    -- Table 3: Simulation Results
+    CREATE TABLE IF NOT EXISTS simulation_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scenario_id TEXT NOT NULL,
+        route_id TEXT NOT NULL,
+        timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')),
+        travel_time_seconds REAL NOT NULL,
+        distance_meters REAL NOT NULL,
+        avg_speed_kmh REAL,
+        num_vehicles INTEGER,
+        simulation_params BLOB,
+        FOREIGN KEY (route_id) REFERENCES probe_routes (route_id)
+    );
+
+    -- Table 4: Calibration Parameters
+    CREATE TABLE IF NOT EXISTS calibration_params (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scenario_id TEXT NOT NULL,
+        param_name TEXT NOT NULL,
+        param_value REAL NOT NULL,
+        timestamp TEXT NOT NULL,
+        rmse REAL,
+        mae REAL,
+        notes TEXT
+    );
+
+    -- Table 5: Validation Metrics
+    CREATE TABLE IF NOT EXISTS validation_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scenario_id TEXT NOT NULL,
+        timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')),
+        mae REAL NOT NULL,
+        rmse REAL NOT NULL,
+        mape REAL NOT NULL,
+        r_squared REAL,
+        num_samples INTEGER NOT NULL,
+        time_period_start TEXT,
+        time_period_end TEXT,
+        notes TEXT
+    );
+
+    -- Table 6: Predictions (for tracking accuracy)
+    CREATE TABLE IF NOT EXISTS predictions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        route_id TEXT NOT NULL,
+        prediction_time TEXT NOT NULL,
+        target_time TEXT NOT NULL,
+        predicted_travel_time REAL NOT NULL,
+        actual_travel_time REAL,
+        error_seconds REAL,
+        error_percentage REAL,
+        FOREIGN KEY (route_id) REFERENCES probe_routes (route_id)
+    );
+
+    -- NEW TABLE: Area Traffic Snapshots (aggregated area-wide data)
+    CREATE TABLE IF NOT EXISTS area_traffic_snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        area_id TEXT NOT NULL,
+        snapshot_id TEXT NOT NULL,
+        snapshot_timestamp TEXT NOT NULL,
+        num_samples INTEGER,
+        avg_speed_kmh REAL,
+        min_speed_kmh REAL,
+        max_speed_kmh REAL,
+        FOREIGN KEY (area_id) REFERENCES monitored_areas(area_id)
+    );
+
+    -- NEW TABLE: Calibration History (tracks calibration improvements)
+    CREATE TABLE IF NOT EXISTS calibration_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        area_id TEXT NOT NULL,
+        calibration_date TEXT NOT NULL,
+        sumo_params TEXT NOT NULL,
+        accuracy_mae REAL,
+        accuracy_rmse REAL,
+        accuracy_mape REAL,
+        num_validation_samples INTEGER,
+        notes TEXT,
+        FOREIGN KEY (area_id) REFERENCES monitored_areas(area_id)
+    );
+
+    -- Create indexes for faster queries
+    CREATE INDEX IF NOT EXISTS idx_real_traffic_timestamp
+        ON real_traffic_data(timestamp);
+    -- Superseded by the covering/partial indexes below
+    DROP INDEX IF EXISTS idx_real_traffic_route;
+    DROP INDEX IF EXISTS idx_real_traffic_area;
+    -- Covers the per-route travel time/speed reads (columns, aggregates)
+    CREATE INDEX IF NOT EXISTS idx_real_traffic_route_cover
+        ON real_traffic_data(route_id, timestamp, travel_time_seconds, speed_kmh);
+    -- Probe route rows have no area_id, so only area samples are indexed
+    CREATE INDEX IF NOT EXISTS idx_real_traffic_area_ts
+        ON real_traffic_data(area_id, timestamp) WHERE area_id IS NOT NULL;
+    -- Superseded by idx_sim_results_scenario_route_ts
+    DROP INDEX IF EXISTS idx_sim_results_scenario;
+    CREATE INDEX IF NOT EXISTS idx_sim_results_scenario_route_ts
+        ON simulation_results(scenario_id, route_id, timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_area_snapshots
+        ON area_traffic_snapshots(area_id, snapshot_timestamp);
+    CREATE INDEX IF NOT EXISTS idx_calib_scenario_rmse
+        ON calibration_params(scenario_id, rmse);
+    CREATE INDEX IF NOT EXISTS idx_calib_scenario_ts
+        ON calibration_params(scenario_id, timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_validation_scenario_ts
+        ON validation_metrics(scenario_id, timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_predictions_route_target
+        ON predictions(route_id, target_time);
+    CREATE INDEX IF NOT EXISTS idx_calib_history_area_rmse
+        ON calibration_history(area_id, accuracy_rmse);
+
+    -- Latest snapshot and running sample count kept on the area row, so
+    -- area listings don't aggregate area_traffic_snapshots
+    CREATE TRIGGER IF NOT EXISTS trg_area_snapshot_latest AFTER INSERT ON area_traffic_snapshots
+    BEGIN
+        UPDATE monitored_areas
+        SET last_snapshot_ts = NEW.snapshot_timestamp,
+            last_avg_speed_kmh = NEW.avg_speed_kmh,
+            samples_count = COALESCE(samples_count, 0) + COALESCE(NEW.num_samples, 0)
+        WHERE area_id = NEW.area_id;
+    END;
+"""
+
+
+def _row_type(name: str, fields: tuple):
+    """
+    Tuple-backed row type for hot read paths: a namedtuple (no per-row
+    dict, __slots__ = ()) that still supports row['column'], get(),
+    keys() and dict(row) like the dicts it replaces
+    """
+    base = namedtuple(name, fields)
+    index = {field: i for i, field in enumerate(fields)}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, index[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return tuple.__getitem__(self, index[key]) if key in index else default
+
+    def keys(self):
+        return fields
+
+    return type(name, (base,), {
+        '__slots__': (),
+        '__getitem__': __getitem__,
+        'get': get,
+        'keys': keys
+    })
+
+
+RealTrafficRow = _row_type('RealTrafficRow', _REAL_TRAFFIC_FIELDS)
+SimulationResultRow = _row_type('SimulationResultRow', _SIM_RESULT_FIELDS)
+
+
 class DigitalTwinDatabase:
     """Manages all database operations for the digital twin"""
+
+    # Read-only connections opened on demand for the heavy query paths
+    READ_POOL_SIZE = 4
+    # Rows fetched per round trip by the iter_* getters
+    FETCH_BATCH_SIZE = 1000
+    # batch() blocks writing at least this many rows re-ANALYZE the big tables
+    ANALYZE_AFTER_ROWS = 10000
+    # Seconds get_summary_stats may serve a cached result
+    STATS_TTL = 5.0
     
-    def __init__(self, db_path: str = "data/digital_twin.db"):
+    def __init__(self, db_path: str = "data/digital_twin.db", unsafe_fast: bool = False):
         self.db_path = db_path
+        self.unsafe_fast = unsafe_fast
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         self.conn = None
         self.connect()
-        self.migrate_schema()  # Handle schema updates
-        self.create_tables()
+        # (stats, monotonic time, change count) of the last get_summary_stats
+        self._stats_cache = (None, 0.0, -1)
+        self._stats_lock = threading.Lock()
+        # Warm start: the schema is already current, skip migration and DDL
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.migrate_schema()  # Handle schema updates
+            self.create_tables()
+        if os.environ.get('DTW_DB_DEBUG') == '1':
+            self._validate_indexes()
     
     def connect(self):
         """Connect to database"""
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # Autocommit at the driver level: no implicit BEGIN before DML.
+        # Single statements commit on their own; multi-statement writes
+        # open an explicit transaction (_transaction(), batch()).
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                                    cached_statements=256)
         self.conn.row_factory = sqlite3.Row  # Return dict-like rows
-        print(f"[DB] Connected to {self.db_path}")
+        self._apply_pragmas(self.conn)
+        if self.unsafe_fast:
+            for name, value in UNSAFE_FAST_PRAGMAS.items():
+                self.conn.execute(f"PRAGMA {name}={value}")
+
+        # The connection is shared across threads: every write holds
+        # _write_lock (directly or via _transaction()), and the single-row
+        # store_* calls share one cursor under it. Reentrant, because
+        # batch() holds it for the whole block while its writes take it again.
+        self._write_lock = threading.RLock()
+        self._write_cursor = self.conn.cursor()
+
+        # Thread running a batch() block: only its writes join the batch
+        # transaction, other threads wait on _write_lock until it ends
+        self._batch_owner = None
+
+        # Read-only connection pool (see reader()). It needs a database
+        # file to reopen: ":memory:" and the like read on the main connection.
+        self._use_readers = self.db_path != ":memory:" and Path(self.db_path).is_file()
+        self._readers = queue.Queue()
+        self._readers_opened = 0
+        self._readers_lock = threading.Lock()
+
+        # Store JSON payloads as JSONB when this SQLite build supports it
+        try:
+            self.conn.execute("SELECT jsonb('{}')")
+            self.has_jsonb = True
+        except sqlite3.OperationalError:
+            self.has_jsonb = False
+
+        to_json, from_json = ('jsonb', 'json') if self.has_jsonb else ('', '')
+        self._sql_insert_real_traffic = _SQL_INSERT_REAL_TRAFFIC.format(to_json=to_json)
+        self._sql_insert_sim_result = _SQL_INSERT_SIM_RESULT.format(to_json=to_json)
+        self._real_traffic_columns = _REAL_TRAFFIC_COLUMNS.format(from_json=from_json)
+        self._sim_result_columns = _SIM_RESULT_COLUMNS.format(from_json=from_json)
+        logger.debug("Connected to %s", self.db_path)
+
+    def _open_reader(self) -> sqlite3.Connection:
+        """Open a read-only connection with the shared PRAGMAs"""
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        for name, value in CONNECTION_PRAGMAS.items():
+            if name != 'journal_mode':  # set by the read-write connection
+                conn.execute(f"PRAGMA {name}={value}")
+        conn.execute("PRAGMA query_only=1")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """
+        Borrow a read-only connection from the pool
+
+        In WAL mode these read concurrently with each other and with
+        writes on the main connection. Only committed data is visible, so
+        reads made by the thread running a batch() use the main connection
+        and see the batch's uncommitted writes. Databases without a file
+        (":memory:") always read on the main connection.
+        """
+        if not self._use_readers or self._batch_owner == threading.get_ident():
+            yield self.conn
+            return
+
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._readers_lock:
+                can_open = self._readers_opened < self.READ_POOL_SIZE
+                if can_open:
+                    self._readers_opened += 1
+            conn = self._open_reader() if can_open else self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def _validate_indexes(self):
+        """
+        Developer check (DTW_DB_DEBUG=1): EXPLAIN QUERY PLAN the hot read
+        shapes and fail if any of them stops seeking through an index
+        """
+        checks = [
+            ("real traffic by route",
+             f"SELECT {self._real_traffic_columns} FROM real_traffic_data"
+             " WHERE route_id = ? AND timestamp >= ? ORDER BY timestamp DESC", ('', '')),
+            ("real traffic by time",
+             f"SELECT {self._real_traffic_columns} FROM real_traffic_data"
+             " WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?", ('', 1)),
+            ("area traffic",
+             f"SELECT {self._real_traffic_columns} FROM real_traffic_data"
+             " WHERE area_id = ? AND timestamp >= ? ORDER BY timestamp DESC", ('', '')),
+            ("simulation results",
+             f"SELECT {self._sim_result_columns} FROM simulation_results"
+             " WHERE scenario_id = ? AND route_id = ? ORDER BY timestamp DESC", ('', '')),
+            ("area snapshots",
+             "SELECT * FROM area_traffic_snapshots"
+             " WHERE area_id = ? ORDER BY snapshot_timestamp DESC", ('',)),
+            ("best calibration",
+             "SELECT rmse, timestamp FROM calibration_params"
+             " WHERE scenario_id = ? AND rmse IS NOT NULL ORDER BY rmse ASC, timestamp DESC LIMIT 1", ('',)),
+        ]
+        tables = {row[0] for row in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+
+        failures = []
+        for name, query, params in checks:
+            plan = [row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+            full_scan = any(
+                detail.startswith("SCAN ") and "INDEX" not in detail
+                and detail.split()[1] in tables
+                for detail in plan
+            )
+            if full_scan or not any("USING" in detail and "INDEX" in detail for detail in plan):
+                failures.append(f"{name}: {'; '.join(plan)}")
+
+        if failures:
+            raise AssertionError("Queries not using an index:\n  " + "\n  ".join(failures))
+        logger.debug("Index check passed for %d queries", len(checks))
+
+    @staticmethod
+    def _apply_pragmas(conn: sqlite3.Connection):
+        """Apply CONNECTION_PRAGMAS to a connection"""
+        for name, value in CONNECTION_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+
+    @contextmanager
+    def batch(self):
+        """
+        Run many write calls as one transaction
+
+        Every write inside the block joins one transaction, committed once
+        on exit or rolled back if the block raises.
+        Nested batch() blocks join the outer one. Batches writing
+        ANALYZE_AFTER_ROWS rows or more are followed by an ANALYZE.
+
+        The write lock is held for the whole block, so writes from other
+        threads wait for the batch to finish instead of joining (and
+        possibly being rolled back with) its transaction. Keep slow work
+        such as HTTP requests outside the block.
+
+        Example:
+            with db.batch():
+                for row in rows:
+                    db.store_real_traffic_data(*row)
+        """
+        with self._write_lock:
+            if self._batch_owner is not None:
+                # Nested in this thread's batch (other threads can't get here)
+                yield
+                return
+
+            if not self.conn.in_transaction:
+                # Take the write lock up front rather than failing to
+                # upgrade a read lock halfway through the batch
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._batch_owner = threading.get_ident()
+
+            changes_before = self.conn.total_changes
+            completed = False
+            try:
+                yield
+                completed = True
+            finally:
+                self._batch_owner = None
+                if completed:
+                    self.conn.commit()
+                else:
+                    self.conn.rollback()
+
+            # Large ingests shift index selectivity; refresh the planner stats
+            if self.conn.total_changes - changes_before >= self.ANALYZE_AFTER_ROWS:
+                self.conn.execute("ANALYZE real_traffic_data")
+                self.conn.execute("ANALYZE simulation_results")
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Hold the write lock for an explicit BEGIN IMMEDIATE ... COMMIT
+        (ROLLBACK on error), or join an enclosing batch()'s transaction
+        """
+        with self._write_lock:
+            if self._batch_owner is not None:
+                yield
+                return
+
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.rollback()
+                raise
+            else:
+                self.conn.commit()
 
     def migrate_schema(self):
         """Migrate existing database to new schema"""
@@ -41,266 +610,313 @@ class DigitalTwinDatabase:
                 columns = {col[1]: {'notnull': col[3]} for col in table_info}
 
                 # Check if route_id has NOT NULL constraint (old schema bug)
+                rebuilt = False
                 if 'route_id' in columns and columns['route_id']['notnull'] == 1:
-                    print("[DB] ⚠️ Fixing old schema: route_id should be nullable")
-                    print("[DB] Recreating real_traffic_data table...")
-
-                    # Create new table with correct schema
-                    cursor.execute("""
-                        CREATE TABLE real_traffic_data_new (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            route_id TEXT,
-                            area_id TEXT,
-                            timestamp TEXT NOT NULL,
-                            travel_time_seconds INTEGER NOT NULL,
-                            distance_meters INTEGER NOT NULL,
-                            traffic_delay_seconds INTEGER,
-                            speed_kmh REAL,
-                            data_source TEXT NOT NULL,
-                            raw_data TEXT,
-                            origin_lat REAL,
-                            origin_lon REAL,
-                            dest_lat REAL,
-                            dest_lon REAL
-                        )
-                    """)
-
-                    # Copy existing data
-                    try:
-                        cursor.execute("""
-                            INSERT INTO real_traffic_data_new
-                            SELECT * FROM real_traffic_data
-                        """)
-                    except:
-                        # If columns don't match, skip data migration
-                        pass
-
-                    # Drop old table and rename
-                    cursor.execute("DROP TABLE real_traffic_data")
-                    cursor.execute("ALTER TABLE real_traffic_data_new RENAME TO real_traffic_data")
-                    print("[DB] ✅ Fixed: route_id is now nullable")
-
-                else:
+                    logger.warning("Fixing old schema: route_id should be nullable")
+
+                    if self._drop_route_id_not_null(cursor):
+                        logger.info("Fixed in place: route_id is now nullable")
+                    else:
+                        logger.info("Recreating real_traffic_data table...")
+                        rebuilt = True
+
+                        # One transaction: a failure can't leave the table half-rebuilt
+                        with self._transaction():
+                            # Create new table with correct schema
+                            cursor.execute("""
+                                CREATE TABLE real_traffic_data_new (
+                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    route_id TEXT,
+                                    area_id TEXT,
+                                    timestamp TEXT NOT NULL,
+                                    travel_time_seconds INTEGER NOT NULL,
+                                    distance_meters INTEGER NOT NULL,
+                                    traffic_delay_seconds INTEGER,
+                                    speed_kmh REAL,
+                                    data_source TEXT NOT NULL,
+                                    raw_data BLOB,
+                                    origin_lat REAL,
+                                    origin_lon REAL,
+                                    dest_lat REAL,
+                                    dest_lon REAL
+                                )
+                            """)
+
+                            # Copy existing data
+                            try:
+                                cursor.execute("""
+                                    INSERT INTO real_traffic_data_new
+                                    SELECT * FROM real_traffic_data
+                                """)
+                            except:
+                                # If columns don't match, skip data migration
+                                pass
+
+                            # Drop old table and rename
+                            cursor.execute("DROP TABLE real_traffic_data")
+                            cursor.execute("ALTER TABLE real_traffic_data_new RENAME TO real_traffic_data")
+                        logger.info("Fixed: route_id is now nullable")
+
+                if not rebuilt:
                     # Add missing columns if needed
                     column_names = [col[1] for col in table_info]
 
                     if 'area_id' not in column_names:
-                        print("[DB] Adding area_id column...")
+                        logger.info("Adding area_id column...")
                         cursor.execute("ALTER TABLE real_traffic_data ADD COLUMN area_id TEXT")
 
                     if 'origin_lat' not in column_names:
-                        print("[DB] Adding coordinate columns...")
+                        logger.info("Adding coordinate columns...")
                         cursor.execute("ALTER TABLE real_traffic_data ADD COLUMN origin_lat REAL")
                         cursor.execute("ALTER TABLE real_traffic_data ADD COLUMN origin_lon REAL")
                         cursor.execute("ALTER TABLE real_traffic_data ADD COLUMN dest_lat REAL")
                         cursor.execute("ALTER TABLE real_traffic_data ADD COLUMN dest_lon REAL")
 
-            # Check if probe_routes has area_id column
+            # Denormalized latest-snapshot columns on monitored_areas
+            cursor.execute("PRAGMA table_info(monitored_areas)")
+            area_columns = [col[1] for col in cursor.fetchall()]
+
+            if area_columns and 'last_snapshot_ts' not in area_columns:
+                with self._transaction():
+                    cursor.execute("ALTER TABLE monitored_areas ADD COLUMN last_snapshot_ts TEXT")
+                    cursor.execute("ALTER TABLE monitored_areas ADD COLUMN last_avg_speed_kmh REAL")
+                    cursor.execute("ALTER TABLE monitored_areas ADD COLUMN samples_count INTEGER DEFAULT 0")
+                    cursor.execute("""
+                        UPDATE monitored_areas
+                        SET (last_snapshot_ts, last_avg_speed_kmh) = (
+                                SELECT snapshot_timestamp, avg_speed_kmh
+                                FROM area_traffic_snapshots s
+                                WHERE s.area_id = monitored_areas.area_id
+                                ORDER BY snapshot_timestamp DESC
+                                LIMIT 1
+                            ),
+                            samples_count = (
+                                SELECT COALESCE(SUM(num_samples), 0)
+                                FROM area_traffic_snapshots s
+                                WHERE s.area_id = monitored_areas.area_id
+                            )
+                    """)
+                logger.info("Added latest snapshot columns to monitored_areas")
+
+            # Check if probe_routes has area_id column (a new database has
+            # no probe_routes yet: create_tables makes it with every column)
             cursor.execute("PRAGMA table_info(probe_routes)")
             columns = [col[1] for col in cursor.fetchall()]
 
-            if 'area_id' not in columns:
+            if columns and 'area_id' not in columns:
                 cursor.execute("ALTER TABLE probe_routes ADD COLUMN area_id TEXT")
-                print("[DB] Added area_id to probe_routes")
+                logger.info("Added area_id to probe_routes")
 
-            if 'is_primary' not in columns:
+            if columns and 'is_primary' not in columns:
                 cursor.execute("ALTER TABLE probe_routes ADD COLUMN is_primary INTEGER DEFAULT 0")
                 cursor.execute("ALTER TABLE probe_routes ADD COLUMN priority INTEGER DEFAULT 0")
-                print("[DB] Added is_primary and priority to probe_routes")
+                logger.info("Added is_primary and priority to probe_routes")
 
-            self.conn.commit()
-            print("[DB] Schema migration complete")
+            logger.debug("Schema migration complete")
 
         except Exception as e:
-            # Table doesn't exist yet, that's fine
-            print(f"[DB] Migration skipped: {e}")
-            pass
+            # Missing tables are skipped above, so this is an existing
+            # table that failed to migrate
+            logger.warning("Migration skipped: %s", e)
+
+    def _drop_route_id_not_null(self, cursor) -> bool:
+        """
+        Drop NOT NULL from real_traffic_data.route_id by editing the stored
+        CREATE TABLE text, a change SQLite documents as safe with
+        writable_schema because stored records don't change. This avoids
+        copying the whole table.
+
+        Returns:
+            False (schema left as it was) if the patch can't be applied or
+            the database fails quick_check afterwards
+        """
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'real_traffic_data'")
+        original = cursor.fetchone()[0]
+        patched = re.sub(r'\broute_id\s+TEXT\s+NOT\s+NULL\b', 'route_id TEXT', original,
+                         count=1, flags=re.IGNORECASE)
+        if patched == original:
+            return False
+
+        def set_table_sql(sql):
+            self.conn.commit()
+            version = cursor.execute("PRAGMA schema_version").fetchone()[0]
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("PRAGMA writable_schema = ON")
+                cursor.execute(
+                    "UPDATE sqlite_master SET sql = ? WHERE type = 'table' AND name = 'real_traffic_data'",
+                    (sql,)
+                )
+                # Makes every connection reload the schema
+                cursor.execute(f"PRAGMA schema_version = {version + 1}")
+                self.conn.commit()
+            finally:
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                cursor.execute("PRAGMA writable_schema = OFF")
+
+        try:
+            set_table_sql(patched)
+        except sqlite3.DatabaseError:
+            return False
+
+        if cursor.execute("PRAGMA quick_check").fetchone()[0] != 'ok':
+            set_table_sql(original)
+            return False
+        return True
 
     def create_tables(self):
-        """Create all necessary tables"""
-        cursor = self.conn.cursor()
+        """
+        Create all necessary tables
 
-        # NEW TABLE: Monitored Areas (fixed geographic areas for training)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS monitored_areas (
-                area_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                bbox_north REAL NOT NULL,
-                bbox_south REAL NOT NULL,
-                bbox_east REAL NOT NULL,
-                bbox_west REAL NOT NULL,
-                sumo_network_file TEXT,
-                status TEXT DEFAULT 'created',
-                training_start_date TEXT,
-                training_end_date TEXT,
-                training_duration_days INTEGER,
-                collections_completed INTEGER DEFAULT 0,
-                collections_target INTEGER,
-                accuracy_rmse REAL,
-                accuracy_mae REAL,
-                accuracy_mape REAL,
-                created_at TEXT NOT NULL
-            )
-        """)
+        All DDL runs as one script, then PRAGMA user_version is stamped
+        with SCHEMA_VERSION so later starts skip schema setup (see __init__)
+        """
+        self.conn.executescript(SCHEMA_SQL)
 
-        # Table 1: Probe Routes (routes we monitor)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS probe_routes (
-                route_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                origin_lat REAL NOT NULL,
-                origin_lon REAL NOT NULL,
-                dest_lat REAL NOT NULL,
-                dest_lon REAL NOT NULL,
-                description TEXT,
-                created_at TEXT NOT NULL,
-                active INTEGER DEFAULT 1,
-                is_primary INTEGER DEFAULT 0,
-                priority INTEGER DEFAULT 0,
-                area_id TEXT,
-                FOREIGN KEY (area_id) REFERENCES monitored_areas(area_id)
-            )
-        """)
-        
-        # Table 2: Real Traffic Data (from APIs)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS real_traffic_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                route_id TEXT,
-                area_id TEXT,
-                timestamp TEXT NOT NULL,
-                travel_time_seconds INTEGER NOT NULL,
-                distance_meters INTEGER NOT NULL,
-                traffic_delay_seconds INTEGER,
-                speed_kmh REAL,
-                data_source TEXT NOT NULL,
-                raw_data TEXT,
-                origin_lat REAL,
-                origin_lon REAL,
-                dest_lat REAL,
-                dest_lon REAL,
-                FOREIGN KEY (route_id) REFERENCES probe_routes (route_id),
-                FOREIGN KEY (area_id) REFERENCES monitored_areas (area_id)
-            )
-        """)
-        
-        # Table 3: Simulation Results
+        cursor = self.conn.cursor()
+        with self._transaction():
+            self._create_row_counters(cursor)
+            self._create_simulation_totals(cursor)
+            self._convert_json_columns()
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        logger.debug("Database schema created/verified")
+
+    def _create_row_counters(self, cursor):
+        """
+        Keep row counts and the distinct scenario list up to date with
+        triggers, so get_summary_stats does not scan the large tables.
+        A counter is seeded with COUNT(*) only when its triggers are
+        missing (new database, or the table was rebuilt by a migration).
+        """
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS simulation_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                scenario_id TEXT NOT NULL,
-                route_id TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                travel_time_seconds REAL NOT NULL,
-                distance_meters REAL NOT NULL,
-                avg_speed_kmh REAL,
-                num_vehicles INTEGER,
-                simulation_params TEXT,
-                FOREIGN KEY (route_id) REFERENCES probe_routes (route_id)
+            CREATE TABLE IF NOT EXISTS row_counters (
+                name TEXT PRIMARY KEY,
+                n INTEGER NOT NULL
             )
         """)
-        
-        # Table 4: Calibration Parameters
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS calibration_params (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                scenario_id TEXT NOT NULL,
-                param_name TEXT NOT NULL,
-                param_value REAL NOT NULL,
-                timestamp TEXT NOT NULL,
-                rmse REAL,
-                mae REAL,
-                notes TEXT
+            CREATE TABLE IF NOT EXISTS simulation_scenarios (
+                scenario_id TEXT PRIMARY KEY
             )
         """)
-        
-        # Table 5: Validation Metrics
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        triggers = {row[0] for row in cursor.fetchall()}
+
+        for table in _COUNTED_TABLES:
+            if f"trg_{table}_count_ins" in triggers:
+                continue
+            cursor.execute(f"INSERT OR REPLACE INTO row_counters (name, n) SELECT ?, COUNT(*) FROM {table}", (table,))
+            cursor.execute(f"""
+                CREATE TRIGGER trg_{table}_count_ins AFTER INSERT ON {table}
+                BEGIN UPDATE row_counters SET n = n + 1 WHERE name = '{table}'; END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_del AFTER DELETE ON {table}
+                BEGIN UPDATE row_counters SET n = n - 1 WHERE name = '{table}'; END
+            """)
+
+        if "trg_simulation_scenarios_ins" not in triggers:
+            cursor.execute("INSERT OR IGNORE INTO simulation_scenarios SELECT DISTINCT scenario_id FROM simulation_results")
+            cursor.execute("""
+                CREATE TRIGGER trg_simulation_scenarios_ins AFTER INSERT ON simulation_results
+                BEGIN INSERT OR IGNORE INTO simulation_scenarios VALUES (NEW.scenario_id); END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_simulation_scenarios_del AFTER DELETE ON simulation_results
+                BEGIN
+                    DELETE FROM simulation_scenarios
+                    WHERE scenario_id = OLD.scenario_id
+                    AND NOT EXISTS (SELECT 1 FROM simulation_results WHERE scenario_id = OLD.scenario_id);
+                END
+            """)
+
+    def _create_simulation_totals(self, cursor):
+        """
+        Materialized per-(scenario, route) simulated travel time totals,
+        kept current by triggers on simulation_results, so comparisons
+        read one row per route instead of aggregating every result.
+        Rebuilt from simulation_results when the triggers are missing.
+        """
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS validation_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS simulation_route_totals (
                 scenario_id TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                mae REAL NOT NULL,
-                rmse REAL NOT NULL,
-                mape REAL NOT NULL,
-                r_squared REAL,
-                num_samples INTEGER NOT NULL,
-                time_period_start TEXT,
-                time_period_end TEXT,
-                notes TEXT
-            )
-        """)
-        
-        # Table 6: Predictions (for tracking accuracy)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
                 route_id TEXT NOT NULL,
-                prediction_time TEXT NOT NULL,
-                target_time TEXT NOT NULL,
-                predicted_travel_time REAL NOT NULL,
-                actual_travel_time REAL,
-                error_seconds REAL,
-                error_percentage REAL,
-                FOREIGN KEY (route_id) REFERENCES probe_routes (route_id)
-            )
-        """)
-        
-        # NEW TABLE: Area Traffic Snapshots (aggregated area-wide data)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS area_traffic_snapshots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                area_id TEXT NOT NULL,
-                snapshot_id TEXT NOT NULL,
-                snapshot_timestamp TEXT NOT NULL,
-                num_samples INTEGER,
-                avg_speed_kmh REAL,
-                min_speed_kmh REAL,
-                max_speed_kmh REAL,
-                FOREIGN KEY (area_id) REFERENCES monitored_areas(area_id)
+                n INTEGER NOT NULL,
+                sum_tt REAL NOT NULL,
+                sum_sq REAL NOT NULL,
+                min_tt REAL,
+                max_tt REAL,
+                PRIMARY KEY (scenario_id, route_id)
             )
         """)
 
-        # NEW TABLE: Calibration History (tracks calibration improvements)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS calibration_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                area_id TEXT NOT NULL,
-                calibration_date TEXT NOT NULL,
-                sumo_params TEXT NOT NULL,
-                accuracy_mae REAL,
-                accuracy_rmse REAL,
-                accuracy_mape REAL,
-                num_validation_samples INTEGER,
-                notes TEXT,
-                FOREIGN KEY (area_id) REFERENCES monitored_areas(area_id)
-            )
-        """)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_sim_totals_ins'")
+        if cursor.fetchone():
+            return
 
-        # Create indexes for faster queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_real_traffic_timestamp
-            ON real_traffic_data(timestamp)
-        """)
+        cursor.execute("DELETE FROM simulation_route_totals")
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_real_traffic_route
-            ON real_traffic_data(route_id, timestamp)
+            INSERT INTO simulation_route_totals
+            SELECT scenario_id, route_id, COUNT(*), SUM(travel_time_seconds),
+                   SUM(travel_time_seconds * travel_time_seconds),
+                   MIN(travel_time_seconds), MAX(travel_time_seconds)
+            FROM simulation_results
+            GROUP BY scenario_id, route_id
         """)
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_real_traffic_area
-            ON real_traffic_data(area_id, timestamp)
+            CREATE TRIGGER trg_sim_totals_ins AFTER INSERT ON simulation_results
+            BEGIN
+                INSERT INTO simulation_route_totals
+                VALUES (NEW.scenario_id, NEW.route_id, 1, NEW.travel_time_seconds,
+                        NEW.travel_time_seconds * NEW.travel_time_seconds,
+                        NEW.travel_time_seconds, NEW.travel_time_seconds)
+                ON CONFLICT (scenario_id, route_id) DO UPDATE SET
+                    n = n + 1,
+                    sum_tt = sum_tt + excluded.sum_tt,
+                    sum_sq = sum_sq + excluded.sum_sq,
+                    min_tt = MIN(min_tt, excluded.min_tt),
+                    max_tt = MAX(max_tt, excluded.max_tt);
+            END
         """)
+        # MIN/MAX can't be decremented, so a delete recomputes its group
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_sim_results_scenario
-            ON simulation_results(scenario_id, route_id)
-        """)
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_area_snapshots
-            ON area_traffic_snapshots(area_id, snapshot_timestamp)
+            CREATE TRIGGER IF NOT EXISTS trg_sim_totals_del AFTER DELETE ON simulation_results
+            BEGIN
+                UPDATE simulation_route_totals
+                SET (n, sum_tt, sum_sq, min_tt, max_tt) = (
+                    SELECT COUNT(*), TOTAL(travel_time_seconds),
+                           TOTAL(travel_time_seconds * travel_time_seconds),
+                           MIN(travel_time_seconds), MAX(travel_time_seconds)
+                    FROM simulation_results
+                    WHERE scenario_id = OLD.scenario_id AND route_id = OLD.route_id
+                )
+                WHERE scenario_id = OLD.scenario_id AND route_id = OLD.route_id;
+                DELETE FROM simulation_route_totals WHERE n = 0;
+            END
         """)
 
-        self.conn.commit()
-        print("[DB] Database schema created/verified")
+    def _convert_json_columns(self):
+        """
+        One-off conversion of JSON text payloads to JSONB (tracked in
+        PRAGMA user_version so later starts skip the table scan)
+        """
+        if not self.has_jsonb:
+            return
+
+        cursor = self.conn.cursor()
+        if cursor.execute("PRAGMA user_version").fetchone()[0] >= 1:
+            return
+
+        cursor.execute("UPDATE real_traffic_data SET raw_data = jsonb(raw_data) WHERE typeof(raw_data) = 'text'")
+        converted = cursor.rowcount
+        cursor.execute("UPDATE simulation_results SET simulation_params = jsonb(simulation_params) WHERE typeof(simulation_params) = 'text'")
+        converted += cursor.rowcount
+        cursor.execute("PRAGMA user_version = 1")
+
+        if converted:
+            logger.info("Converted %d JSON payloads to JSONB", converted)
     
     # ========== PROBE ROUTES ==========
     
@@ -317,27 +933,52 @@ class DigitalTwinDatabase:
         priority: int = 0
     ):
         """Add a probe route to monitor"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO probe_routes
-            (route_id, name, origin_lat, origin_lon, dest_lat, dest_lon,
-             description, created_at, is_primary, priority)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (route_id, name, origin_lat, origin_lon, dest_lat, dest_lon,
-              description, datetime.now().isoformat(), 1 if is_primary else 0, priority))
-        self.conn.commit()
-        print(f"[DB] Added probe route: {name}")
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(_SQL_UPSERT_PROBE_ROUTE, (route_id, name, origin_lat, origin_lon, dest_lat, dest_lon,
+                  description, 1 if is_primary else 0, priority))
+        logger.debug("Added probe route: %s", name)
     
+    def add_probe_routes_bulk(self, rows: List[tuple], deactivate_prefix: str = None):
+        """
+        Add many probe routes in a single transaction
+
+        Args:
+            rows: (route_id, name, origin_lat, origin_lon, dest_lat, dest_lon, description) tuples
+            deactivate_prefix: If given, first deactivate existing routes whose
+                route_id starts with this prefix (in the same transaction)
+        """
+        cursor = self.conn.cursor()
+
+        with self._transaction():
+            if deactivate_prefix is not None:
+                # Range form of a prefix match, so SQLite can use the
+                # route_id primary key index (LIKE is case-insensitive and
+                # can't use it)
+                cursor.execute("""
+                    UPDATE probe_routes
+                    SET active = 0
+                    WHERE route_id >= ? AND route_id < ?
+                """, (deactivate_prefix, deactivate_prefix + '\U0010ffff'))
+
+            cursor.executemany(
+                _SQL_UPSERT_PROBE_ROUTE,
+                [row + (0, 0) for row in rows]
+            )
+        logger.debug("Added %d probe routes", len(rows))
+
     def get_probe_routes(self, active_only: bool = True, primary_only: bool = False) -> List[Dict]:
         """Get all probe routes"""
-        cursor = self.conn.cursor()
         query = "SELECT * FROM probe_routes WHERE 1=1"
         if active_only:
             query += " AND active = 1"
         if primary_only:
             query += " AND is_primary = 1 ORDER BY priority ASC"
-        cursor.execute(query)
-        return [dict(row) for row in cursor.fetchall()]
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples, see _fetch_dicts
+            cursor.execute(query)
+            return self._fetch_dicts(cursor)
 
     def get_primary_routes(self) -> List[Dict]:
         """Get the 5 primary routes for congestion prediction"""
@@ -355,41 +996,82 @@ class DigitalTwinDatabase:
         data_source: str = "google_maps",
         raw_data: Dict = None,
         timestamp: datetime = None
-    ):
-        """Store real-world traffic measurement with optional custom timestamp"""
-        cursor = self.conn.cursor()
-
-        # Use provided timestamp or current time
-        if timestamp is None:
-            timestamp_str = datetime.now().isoformat()
-        elif isinstance(timestamp, datetime):
+    ) -> int:
+        """Store real-world traffic measurement with optional custom timestamp; returns the row id"""
+        # Use provided timestamp; None lets SQLite stamp the current time
+        if isinstance(timestamp, datetime):
             timestamp_str = timestamp.isoformat()
         else:
-            timestamp_str = timestamp  # Already a string
+            timestamp_str = timestamp  # Already a string (or None)
 
-        cursor.execute("""
-            INSERT INTO real_traffic_data
-            (route_id, timestamp, travel_time_seconds, distance_meters,
-             traffic_delay_seconds, speed_kmh, data_source, raw_data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (route_id, timestamp_str, travel_time_seconds,
-              distance_meters, traffic_delay_seconds, speed_kmh, data_source,
-              json.dumps(raw_data) if raw_data else None))
-        self.conn.commit()
+        with self._write_lock:
+            self._write_cursor.execute(self._sql_insert_real_traffic, (
+                route_id, timestamp_str, travel_time_seconds,
+                distance_meters, traffic_delay_seconds, speed_kmh, data_source,
+                _dump_json(raw_data) if raw_data else None
+            ))
+            return self._write_cursor.lastrowid
+
+    def store_real_traffic_data_bulk(self, rows: List[tuple]):
+        """
+        Store many real-world traffic measurements in one transaction
+
+        Args:
+            rows: (route_id, timestamp, travel_time_seconds, distance_meters,
+                traffic_delay_seconds, speed_kmh, data_source, raw_data) tuples;
+                timestamp may be None (stamped by SQLite) and raw_data a dict or None
+        """
+        with self._transaction():
+            self.conn.executemany(self._sql_insert_real_traffic, [
+                (route_id, timestamp, travel_time, distance, delay, speed, source,
+                 _dump_json(raw_data) if raw_data else None)
+                for route_id, timestamp, travel_time, distance, delay, speed, source, raw_data in rows
+            ])
     
     def get_real_traffic_data(
         self,
         route_id: str = None,
         start_time: str = None,
         end_time: str = None,
-        limit: int = None
-    ) -> List[Dict]:
-        """Query real traffic data"""
-        cursor = self.conn.cursor()
-        
-        query = "SELECT * FROM real_traffic_data WHERE 1=1"
+        limit: int = None,
+        before: str = None,
+        before_id: int = None,
+        include_archived: bool = False
+    ) -> List[RealTrafficRow]:
+        """
+        Query real traffic data (rows support row['column'] like dicts);
+        include_archived also reads the monthly archive tables
+        """
+        return list(self.iter_real_traffic_data(
+            route_id, start_time, end_time, limit, before, before_id, include_archived
+        ))
+
+    def iter_real_traffic_data(
+        self,
+        route_id: str = None,
+        start_time: str = None,
+        end_time: str = None,
+        limit: int = None,
+        before: str = None,
+        before_id: int = None,
+        include_archived: bool = False
+    ):
+        """
+        Query real traffic data, yielding RealTrafficRow rows in FETCH_BATCH_SIZE chunks
+
+        Rows come newest first. To page, pass the timestamp and id of the
+        last row of the previous page as before and before_id (keyset
+        pagination: an index seek, unlike OFFSET which re-reads every
+        skipped row). Bulk inserts share one timestamp, so before alone
+        skips the rest of a page that ends inside such a group.
+        Rows moved out by archive_real_traffic_data are only included with
+        include_archived (read through the real_traffic_data_all view).
+        """
+        with self.reader() as conn:
+            source = self._real_traffic_source(conn, include_archived)
+        query = f"SELECT {self._real_traffic_columns} FROM {source} WHERE 1=1"
         params = []
-        
+
         if route_id:
             query += " AND route_id = ?"
             params.append(route_id)
@@ -399,15 +1081,211 @@ class DigitalTwinDatabase:
         if end_time:
             query += " AND timestamp <= ?"
             params.append(end_time)
-        
-        query += " ORDER BY timestamp DESC"
-        
+        if before and before_id is not None:
+            query += " AND (timestamp, id) < (?, ?)"
+            params.extend((before, before_id))
+        elif before:
+            query += " AND timestamp < ?"
+            params.append(before)
+
+        query += " ORDER BY timestamp DESC, id DESC"
+
         if limit:
-            query += f" LIMIT {limit}"
-        
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        yield from self._iter_rows(query, params, RealTrafficRow)
+
+    def _iter_rows(self, query: str, params, row_type):
+        """Run a read query on a pooled reader and yield row_type rows in chunks"""
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples, wrapped by row_type
+            cursor.execute(query, params)
+            make = row_type._make
+            while True:
+                rows = cursor.fetchmany(self.FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                yield from map(make, rows)
+    
+    def get_real_traffic_data_columns(
+        self,
+        route_id: str,
+        start_time: str = None,
+        end_time: str = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Travel time and speed of a route's measurements as float64 column arrays
+        (missing speeds are NaN), skipping per-row dict construction
+        """
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples
+
+            query = "SELECT travel_time_seconds, speed_kmh FROM real_traffic_data WHERE route_id = ?"
+            params = [route_id]
+
+            if start_time:
+                query += " AND timestamp >= ?"
+                params.append(start_time)
+            if end_time:
+                query += " AND timestamp <= ?"
+                params.append(end_time)
+
+            cursor.execute(query, params)
+            rows = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 2)
+
+            return {
+                'travel_time_seconds': np.ascontiguousarray(rows[:, 0]),
+                'speed_kmh': np.ascontiguousarray(rows[:, 1])
+            }
+
+    def get_real_traffic_aggregates(
+        self,
+        route_ids: List[str],
+        start_time: str = None,
+        end_time: str = None
+    ) -> Dict[str, Dict]:
+        """
+        Per-route travel time aggregates for many routes in one query
+
+        Returns:
+            Dict mapping route_id to avg/std/min/max travel time, avg_speed
+            (ignoring missing or zero speeds) and sample_count. Routes
+            without data are absent.
+        """
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            aggregates = {}
+
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(route_ids), 500):
+                chunk = route_ids[i:i + 500]
+                query = f"""
+                    SELECT route_id,
+                           COUNT(*) AS sample_count,
+                           AVG(travel_time_seconds) AS avg_travel_time,
+                           SUM(travel_time_seconds * travel_time_seconds) AS sum_sq,
+                           MIN(travel_time_seconds) AS min_travel_time,
+                           MAX(travel_time_seconds) AS max_travel_time,
+                           AVG(NULLIF(speed_kmh, 0)) AS avg_speed
+                    FROM real_traffic_data
+                    WHERE route_id IN ({', '.join('?' * len(chunk))})
+                """
+                params = list(chunk)
+
+                if start_time:
+                    query += " AND timestamp >= ?"
+                    params.append(start_time)
+                if end_time:
+                    query += " AND timestamp <= ?"
+                    params.append(end_time)
+
+                query += " GROUP BY route_id"
+
+                cursor.execute(query, params)
+                for row in cursor.fetchall():
+                    aggregate = self._travel_time_aggregate(row)
+                    aggregate['avg_speed'] = row['avg_speed']
+                    aggregates[row['route_id']] = aggregate
+
+            return aggregates
+
+    @staticmethod
+    def _travel_time_aggregate(row) -> Dict:
+        """Build a travel time summary from an aggregate row (population std from SUM(x*x))"""
+        count = row['sample_count']
+        mean = row['avg_travel_time']
+        variance = row['sum_sq'] / count - mean * mean
+
+        return {
+            'avg_travel_time': mean,
+            'std_travel_time': max(variance, 0.0) ** 0.5,
+            'min_travel_time': row['min_travel_time'],
+            'max_travel_time': row['max_travel_time'],
+            'sample_count': count
+        }
     
+    def archive_real_traffic_data(self, keep_months: int = 3) -> int:
+        """
+        Move real traffic rows older than the last keep_months calendar
+        months into per-month tables (real_traffic_data_YYYYMM)
+
+        Keeps real_traffic_data and its indexes small for the hot queries;
+        old months are only read through the real_traffic_data_all view,
+        which is rebuilt to UNION ALL the current table and every archive.
+        Archived rows leave the real_data_points count (they are counted
+        in archived_data_points instead) and are returned by the history
+        readers only with include_archived=True.
+
+        Returns:
+            Number of rows archived
+        """
+        now = datetime.now()
+        month_index = now.year * 12 + now.month - keep_months
+        cutoff = f"{month_index // 12:04d}-{month_index % 12 + 1:02d}-01"
+        columns = ', '.join(_REAL_TRAFFIC_FIELDS)
+        archived = 0
+
+        with self._transaction():
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT DISTINCT substr(timestamp, 1, 7)
+                FROM real_traffic_data
+                WHERE timestamp < ?
+            """, (cutoff,))
+
+            for (month,) in cursor.fetchall():
+                year, mon = int(month[:4]), int(month[5:7])
+                start = f"{month}-01"
+                end = f"{year + mon // 12:04d}-{mon % 12 + 1:02d}-01"
+                table = f"real_traffic_data_{year:04d}{mon:02d}"
+
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT {columns} FROM real_traffic_data WHERE 0")
+                cursor.execute(f"""
+                    INSERT INTO {table} ({columns})
+                    SELECT {columns} FROM real_traffic_data
+                    WHERE timestamp >= ? AND timestamp < ?
+                """, (start, end))
+                cursor.execute("DELETE FROM real_traffic_data WHERE timestamp >= ? AND timestamp < ?", (start, end))
+                archived += cursor.rowcount
+
+            if archived:
+                self._create_real_traffic_view(cursor)
+                cursor.execute("""
+                    INSERT INTO row_counters (name, n) VALUES ('real_traffic_data_archived', ?)
+                    ON CONFLICT(name) DO UPDATE SET n = n + excluded.n
+                """, (archived,))
+
+        if archived:
+            logger.info("Archived %d real traffic rows older than %s", archived, cutoff)
+        return archived
+
+    @staticmethod
+    def _real_traffic_source(conn: sqlite3.Connection, include_archived: bool) -> str:
+        """Table (or archive-spanning view) the real traffic history readers query"""
+        if include_archived and conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = 'real_traffic_data_all'"
+        ).fetchone():
+            return "real_traffic_data_all"
+        return "real_traffic_data"
+
+    def _create_real_traffic_view(self, cursor):
+        """(Re)build real_traffic_data_all over the current table and all monthly archives"""
+        columns = ', '.join(_REAL_TRAFFIC_FIELDS)
+        cursor.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name GLOB 'real_traffic_data_[0-9][0-9][0-9][0-9][0-9][0-9]'
+            ORDER BY name
+        """)
+        tables = ['real_traffic_data'] + [row[0] for row in cursor.fetchall()]
+
+        cursor.execute("DROP VIEW IF EXISTS real_traffic_data_all")
+        cursor.execute("CREATE VIEW real_traffic_data_all AS " + " UNION ALL ".join(
+            f"SELECT {columns} FROM {table}" for table in tables
+        ))
+
     # ========== SIMULATION RESULTS ==========
     
     def store_simulation_result(
@@ -418,40 +1296,116 @@ class DigitalTwinDatabase:
         distance_meters: float,
         avg_speed_kmh: float = None,
         num_vehicles: int = None,
-        simulation_params: Dict = None
-    ):
-        """Store simulation result for a route"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO simulation_results
-            (scenario_id, route_id, timestamp, travel_time_seconds,
-             distance_meters, avg_speed_kmh, num_vehicles, simulation_params)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (scenario_id, route_id, datetime.now().isoformat(),
-              travel_time_seconds, distance_meters, avg_speed_kmh,
-              num_vehicles, json.dumps(simulation_params) if simulation_params else None))
-        self.conn.commit()
+        simulation_params: Dict = None,
+        timestamp: str = None
+    ) -> int:
+        """Store simulation result for a route (timestamp defaults to now); returns the row id"""
+        with self._write_lock:
+            self._write_cursor.execute(self._sql_insert_sim_result, (
+                scenario_id, route_id, timestamp,
+                travel_time_seconds, distance_meters, avg_speed_kmh,
+                num_vehicles, _dump_json(simulation_params) if simulation_params else None
+            ))
+            return self._write_cursor.lastrowid
+    
+    def store_simulation_result_bulk(self, scenario_id: str, rows: List[tuple]):
+        """
+        Store simulation results for many routes in one transaction
+
+        Args:
+            rows: (route_id, travel_time_seconds, distance_meters, avg_speed_kmh,
+                num_vehicles, simulation_params) tuples; simulation_params a dict or None
+        """
+        with self._transaction():
+            self.conn.executemany(self._sql_insert_sim_result, [
+                (scenario_id, route_id, None, travel_time, distance, speed, vehicles,
+                 _dump_json(params) if params else None)
+                for route_id, travel_time, distance, speed, vehicles, params in rows
+            ])
     
     def get_simulation_results(
         self,
         scenario_id: str,
         route_id: str = None
-    ) -> List[Dict]:
-        """Get simulation results"""
-        cursor = self.conn.cursor()
+    ) -> List[SimulationResultRow]:
+        """Get simulation results (rows support row['column'] like dicts)"""
+        return list(self.iter_simulation_results(scenario_id, route_id))
+
+    def iter_simulation_results(self, scenario_id: str, route_id: str = None):
+        """Get simulation results, yielding SimulationResultRow rows in FETCH_BATCH_SIZE chunks"""
         if route_id:
-            cursor.execute("""
-                SELECT * FROM simulation_results 
+            return self._iter_rows(f"""
+                SELECT {self._sim_result_columns} FROM simulation_results
                 WHERE scenario_id = ? AND route_id = ?
                 ORDER BY timestamp DESC
-            """, (scenario_id, route_id))
-        else:
-            cursor.execute("""
-                SELECT * FROM simulation_results 
-                WHERE scenario_id = ?
-                ORDER BY timestamp DESC
-            """, (scenario_id,))
-        return [dict(row) for row in cursor.fetchall()]
+            """, (scenario_id, route_id), SimulationResultRow)
+        return self._iter_rows(f"""
+            SELECT {self._sim_result_columns} FROM simulation_results
+            WHERE scenario_id = ?
+            ORDER BY timestamp DESC
+        """, (scenario_id,), SimulationResultRow)
+    
+    def get_simulation_aggregates(self, scenario_id: str, route_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Per-route simulated travel time aggregates for one scenario
+        (read from the trigger-maintained simulation_route_totals)
+
+        Returns:
+            Dict mapping route_id to avg/std/min/max travel time and
+            sample_count. Routes without results are absent.
+        """
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            aggregates = {}
+
+            for i in range(0, len(route_ids), 500):
+                chunk = route_ids[i:i + 500]
+                cursor.execute(f"""
+                    SELECT route_id,
+                           n AS sample_count,
+                           sum_tt / n AS avg_travel_time,
+                           sum_sq,
+                           min_tt AS min_travel_time,
+                           max_tt AS max_travel_time
+                    FROM simulation_route_totals
+                    WHERE scenario_id = ? AND route_id IN ({', '.join('?' * len(chunk))})
+                """, [scenario_id] + list(chunk))
+
+                for row in cursor.fetchall():
+                    aggregates[row['route_id']] = self._travel_time_aggregate(row)
+
+            return aggregates
+
+    def get_route_ids_with_data(
+        self,
+        scenario_id: str,
+        start_time: str = None,
+        end_time: str = None,
+        include_archived: bool = False
+    ) -> set:
+        """
+        Route IDs that have both real data (in the time window) and results for scenario_id;
+        archived real data counts only with include_archived
+        """
+        with self.reader() as conn:
+            cursor = conn.cursor()
+
+            source = self._real_traffic_source(conn, include_archived)
+            query = f"SELECT route_id FROM simulation_route_totals WHERE scenario_id = ? INTERSECT SELECT route_id FROM {source}"
+            params = [scenario_id]
+            conditions = []
+
+            if start_time:
+                conditions.append("timestamp >= ?")
+                params.append(start_time)
+            if end_time:
+                conditions.append("timestamp <= ?")
+                params.append(end_time)
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+
+            cursor.execute(query, params)
+            return {row['route_id'] for row in cursor.fetchall()}
     
     # ========== CALIBRATION ==========
     
@@ -466,30 +1420,39 @@ class DigitalTwinDatabase:
         """Store calibration parameters"""
         cursor = self.conn.cursor()
         timestamp = datetime.now().isoformat()
-        
-        for param_name, param_value in params.items():
-            cursor.execute("""
-                INSERT INTO calibration_params
-                (scenario_id, param_name, param_value, timestamp, rmse, mae, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (scenario_id, param_name, param_value, timestamp, rmse, mae, notes))
-        
-        self.conn.commit()
+        items = list(params.items())
+
+        # One multi-row VALUES statement per chunk; the shared columns are
+        # bound once. 400 pairs stays under SQLite's 999-parameter limit.
+        with self._transaction():
+            for start in range(0, len(items), 400):
+                chunk = items[start:start + 400]
+                cursor.execute(f"""
+                    INSERT INTO calibration_params
+                    (scenario_id, param_name, param_value, timestamp, rmse, mae, notes)
+                    SELECT ?, column1, column2, ?, ?, ?, ?
+                    FROM (VALUES {', '.join(['(?, ?)'] * len(chunk))})
+                """, (scenario_id, timestamp, rmse, mae, notes, *chain.from_iterable(chunk)))
     
     def get_best_calibration(self, scenario_id: str) -> Dict[str, float]:
         """Get best calibration parameters (lowest RMSE)"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT param_name, param_value 
-            FROM calibration_params
-            WHERE scenario_id = ?
-            AND rmse = (
-                SELECT MIN(rmse) FROM calibration_params 
-                WHERE scenario_id = ?
-            )
-        """, (scenario_id, scenario_id))
-        
-        return {row['param_name']: row['param_value'] for row in cursor.fetchall()}
+        # The best run is one seek on the (scenario_id, rmse) index; its
+        # parameters are then a range scan on the same index. Matching on
+        # the run's timestamp too keeps runs that tie on RMSE from mixing.
+        with self.reader() as conn:
+            cursor = conn.execute("""
+                WITH best AS (
+                    SELECT rmse, timestamp FROM calibration_params
+                    WHERE scenario_id = ? AND rmse IS NOT NULL
+                    ORDER BY rmse ASC, timestamp DESC
+                    LIMIT 1
+                )
+                SELECT p.param_name, p.param_value
+                FROM calibration_params p, best
+                WHERE p.scenario_id = ? AND p.rmse = best.rmse AND p.timestamp = best.timestamp
+            """, (scenario_id, scenario_id))
+
+            return {row['param_name']: row['param_value'] for row in cursor.fetchall()}
     
     # ========== VALIDATION METRICS ==========
     
@@ -506,25 +1469,108 @@ class DigitalTwinDatabase:
         notes: str = None
     ):
         """Store validation metrics"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO validation_metrics
-            (scenario_id, timestamp, mae, rmse, mape, r_squared,
-             num_samples, time_period_start, time_period_end, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (scenario_id, datetime.now().isoformat(), mae, rmse, mape,
-              r_squared, num_samples, time_period_start, time_period_end, notes))
-        self.conn.commit()
+        with self._write_lock:
+            self._write_cursor.execute(_SQL_INSERT_VALIDATION, (
+                scenario_id, mae, rmse, mape,
+                r_squared, num_samples, time_period_start, time_period_end, notes
+            ))
     
+    def compute_metrics_sql(
+        self,
+        scenario_id: str,
+        start_time: str = None,
+        end_time: str = None,
+        save_to_db: bool = True
+    ) -> Optional[Dict]:
+        """
+        Compute MAE / RMSE / MAPE / R-squared over active probe routes
+        entirely in SQLite (per-route real averages in the time window vs
+        simulation_route_totals), matching ComparisonEngine's metrics
+        without loading per-route rows into Python.
+
+        If save_to_db, the result is stored in validation_metrics in the
+        same transaction. Returns None when no route has both kinds of data.
+        """
+        query = """
+            WITH real AS (
+                SELECT route_id, AVG(travel_time_seconds) AS r
+                FROM real_traffic_data
+                WHERE route_id IN (SELECT route_id FROM probe_routes WHERE active = 1)
+        """
+        params = []
+
+        if start_time:
+            query += " AND timestamp >= ?"
+            params.append(start_time)
+        if end_time:
+            query += " AND timestamp <= ?"
+            params.append(end_time)
+
+        query += """
+                GROUP BY route_id
+            ),
+            pairs AS (
+                SELECT real.r AS r, t.sum_tt / t.n AS s
+                FROM real
+                JOIN simulation_route_totals t
+                  ON t.route_id = real.route_id AND t.scenario_id = ?
+            ),
+            -- Mean first, then centered squares: SUM(r*r) - n*mean*mean
+            -- cancels catastrophically when travel times are close together
+            stats AS (
+                SELECT AVG(r) AS mean FROM pairs
+            )
+            SELECT COUNT(*) AS num_routes,
+                   AVG(ABS(r - s)) AS mae,
+                   AVG((r - s) * (r - s)) AS mse,
+                   AVG(ABS(r - s) / NULLIF(r, 0)) * 100 AS mape,
+                   SUM((r - s) * (r - s)) AS ss_res,
+                   SUM((r - stats.mean) * (r - stats.mean)) AS ss_tot
+            FROM pairs, stats
+        """
+        params.append(scenario_id)
+
+        if not save_to_db:
+            # Read only: no write lock, no BEGIN IMMEDIATE
+            with self.reader() as conn:
+                return self._metrics_from_row(conn.execute(query, params).fetchone())
+
+        with self._transaction():
+            metrics = self._metrics_from_row(self.conn.execute(query, params).fetchone())
+            if metrics is not None:
+                self.conn.execute(_SQL_INSERT_VALIDATION, (
+                    scenario_id, metrics['mae'], metrics['rmse'], metrics['mape'],
+                    metrics['r_squared'], metrics['num_routes'], start_time, end_time, None
+                ))
+
+        return metrics
+
+    @staticmethod
+    def _metrics_from_row(row) -> Optional[Dict]:
+        """Metrics dict from compute_metrics_sql's aggregate row (None without routes)"""
+        if not row['num_routes']:
+            return None
+
+        ss_tot = row['ss_tot']
+        return {
+            'mae': row['mae'],
+            'rmse': row['mse'] ** 0.5,
+            'mape': row['mape'],
+            'r_squared': 1 - row['ss_res'] / ss_tot if ss_tot > 0 else 0,
+            'num_routes': row['num_routes']
+        }
+
     def get_validation_metrics(self, scenario_id: str) -> List[Dict]:
         """Get all validation metrics for a scenario"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM validation_metrics 
-            WHERE scenario_id = ?
-            ORDER BY timestamp DESC
-        """, (scenario_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples, see _fetch_dicts
+            cursor.execute("""
+                SELECT * FROM validation_metrics
+                WHERE scenario_id = ?
+                ORDER BY timestamp DESC
+            """, (scenario_id,))
+            return self._fetch_dicts(cursor)
     
     # ========== MONITORED AREAS (NEW) ==========
 
@@ -536,57 +1582,58 @@ class DigitalTwinDatabase:
         sumo_network_file: str = None
     ):
         """Create a new monitored area for training"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO monitored_areas
-            (area_id, name, bbox_north, bbox_south, bbox_east, bbox_west,
-             sumo_network_file, status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'created', ?)
-        """, (
-            area_id,
-            name,
-            bbox['north'],
-            bbox['south'],
-            bbox['east'],
-            bbox['west'],
-            sumo_network_file,
-            datetime.now().isoformat()
-        ))
-        self.conn.commit()
-        print(f"[DB] Created monitored area: {name} ({area_id})")
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                INSERT INTO monitored_areas
+                (area_id, name, bbox_north, bbox_south, bbox_east, bbox_west,
+                 sumo_network_file, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'created', {_SQL_NOW})
+            """, (
+                area_id,
+                name,
+                bbox['north'],
+                bbox['south'],
+                bbox['east'],
+                bbox['west'],
+                sumo_network_file
+            ))
+        logger.debug("Created monitored area: %s (%s)", name, area_id)
 
     def get_monitored_area(self, area_id: str) -> Dict:
         """Get area details"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM monitored_areas WHERE area_id = ?", (area_id,))
-        row = cursor.fetchone()
-        if row:
-            area = dict(row)
-            # Reconstruct bbox dict
-            area['bbox'] = {
-                'north': area['bbox_north'],
-                'south': area['bbox_south'],
-                'east': area['bbox_east'],
-                'west': area['bbox_west']
-            }
-            return area
-        return None
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM monitored_areas WHERE area_id = ?", (area_id,))
+            row = cursor.fetchone()
+            if row:
+                area = dict(row)
+                # Reconstruct bbox dict
+                area['bbox'] = {
+                    'north': area['bbox_north'],
+                    'south': area['bbox_south'],
+                    'east': area['bbox_east'],
+                    'west': area['bbox_west']
+                }
+                return area
+            return None
 
     def get_all_monitored_areas(self) -> List[Dict]:
         """Get all monitored areas"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM monitored_areas ORDER BY created_at DESC")
-        areas = []
-        for row in cursor.fetchall():
-            area = dict(row)
-            area['bbox'] = {
-                'north': area['bbox_north'],
-                'south': area['bbox_south'],
-                'east': area['bbox_east'],
-                'west': area['bbox_west']
-            }
-            areas.append(area)
-        return areas
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM monitored_areas ORDER BY created_at DESC")
+            areas = []
+            for row in cursor.fetchall():
+                area = dict(row)
+                area['bbox'] = {
+                    'north': area['bbox_north'],
+                    'south': area['bbox_south'],
+                    'east': area['bbox_east'],
+                    'west': area['bbox_west']
+                }
+                areas.append(area)
+            return areas
 
     def update_area_status(
         self,
@@ -597,8 +1644,6 @@ class DigitalTwinDatabase:
         collections_target: int = None
     ):
         """Update area training status"""
-        cursor = self.conn.cursor()
-
         updates = ["status = ?"]
         params = [status]
 
@@ -615,19 +1660,27 @@ class DigitalTwinDatabase:
         params.append(area_id)
 
         query = f"UPDATE monitored_areas SET {', '.join(updates)} WHERE area_id = ?"
-        cursor.execute(query, params)
-        self.conn.commit()
-        print(f"[DB] Updated area status: {area_id} -> {status}")
+        with self._write_lock:
+            self.conn.execute(query, params)
+        logger.debug("Updated area status: %s -> %s", area_id, status)
 
     def update_area_training_progress(self, area_id: str, collections_completed: int):
         """Update training progress"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE monitored_areas
-            SET collections_completed = ?
-            WHERE area_id = ?
-        """, (collections_completed, area_id))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                UPDATE monitored_areas
+                SET collections_completed = ?
+                WHERE area_id = ?
+            """, (collections_completed, area_id))
+
+    def set_area_network_file(self, area_id: str, network_file: str):
+        """Record the SUMO network built for an area"""
+        with self._write_lock:
+            self.conn.execute(
+                "UPDATE monitored_areas SET sumo_network_file = ? WHERE area_id = ?",
+                (network_file, area_id)
+            )
 
     def mark_area_training_complete(
         self,
@@ -637,44 +1690,88 @@ class DigitalTwinDatabase:
         accuracy_mape: float
     ):
         """Mark training as complete with accuracy metrics"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE monitored_areas
-            SET status = 'trained',
-                training_end_date = ?,
-                accuracy_rmse = ?,
-                accuracy_mae = ?,
-                accuracy_mape = ?
-            WHERE area_id = ?
-        """, (
-            datetime.now().isoformat(),
-            accuracy_rmse,
-            accuracy_mae,
-            accuracy_mape,
-            area_id
-        ))
-        self.conn.commit()
-        print(f"[DB] Area training complete: {area_id}")
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                UPDATE monitored_areas
+                SET status = 'trained',
+                    training_end_date = {_SQL_NOW},
+                    accuracy_rmse = ?,
+                    accuracy_mae = ?,
+                    accuracy_mape = ?
+                WHERE area_id = ?
+            """, (
+                accuracy_rmse,
+                accuracy_mae,
+                accuracy_mape,
+                area_id
+            ))
+        logger.debug("Area training complete: %s", area_id)
 
     def link_route_to_area(self, route_id: str, area_id: str):
         """Link a route to its parent area"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE probe_routes
-            SET area_id = ?
-            WHERE route_id = ?
-        """, (area_id, route_id))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                UPDATE probe_routes
+                SET area_id = ?
+                WHERE route_id = ?
+            """, (area_id, route_id))
 
     def get_routes_in_area(self, area_id: str) -> List[Dict]:
         """Get all routes within an area"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM probe_routes
-            WHERE area_id = ? AND active = 1
-            ORDER BY priority ASC
-        """, (area_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples, see _fetch_dicts
+            cursor.execute("""
+                SELECT * FROM probe_routes
+                WHERE area_id = ? AND active = 1
+                ORDER BY priority ASC
+            """, (area_id,))
+            return self._fetch_dicts(cursor)
+
+    def get_area_with_route_traffic(self, area_id: str, since_ts: str = None) -> List[Dict]:
+        """
+        Active routes of an area with their measurements since since_ts, in
+        one query (instead of get_routes_in_area plus a get_real_traffic_data
+        per route)
+
+        Each route dict carries a 'traffic' list of {timestamp,
+        travel_time_seconds, speed_kmh}, newest first. Routes without
+        measurements get an empty list.
+        """
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples
+            # The join reads only idx_real_traffic_route_cover columns
+            cursor.execute("""
+                SELECT pr.route_id, pr.name, pr.priority,
+                       rtd.timestamp, rtd.travel_time_seconds, rtd.speed_kmh
+                FROM probe_routes pr
+                LEFT JOIN real_traffic_data rtd
+                    ON rtd.route_id = pr.route_id AND rtd.timestamp >= ?
+                WHERE pr.area_id = ? AND pr.active = 1
+                ORDER BY pr.priority ASC, pr.route_id, rtd.timestamp DESC
+            """, (since_ts or '', area_id))
+
+            routes = {}
+            for route_id, name, priority, timestamp, travel_time, speed in cursor.fetchall():
+                route = routes.get(route_id)
+                if route is None:
+                    route = routes[route_id] = {
+                        'route_id': route_id,
+                        'name': name,
+                        'priority': priority,
+                        'traffic': []
+                    }
+                if timestamp is not None:
+                    route['traffic'].append({
+                        'timestamp': timestamp,
+                        'travel_time_seconds': travel_time,
+                        'speed_kmh': speed
+                    })
+
+            return list(routes.values())
 
     # ========== AREA TRAFFIC DATA (NEW) ==========
 
@@ -692,27 +1789,69 @@ class DigitalTwinDatabase:
         data_source: str = "google_maps"
     ):
         """Store area-wide traffic sample (not tied to specific route)"""
-        cursor = self.conn.cursor()
         # Use snapshot_id as pseudo route_id for area-wide samples
-        cursor.execute("""
-            INSERT INTO real_traffic_data
-            (route_id, area_id, timestamp, travel_time_seconds, distance_meters,
-             speed_kmh, data_source, origin_lat, origin_lon, dest_lat, dest_lon)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            snapshot_id,  # Use snapshot_id as route_id for area-wide data
-            area_id,
-            datetime.now().isoformat(),
-            travel_time_seconds,
-            distance_meters,
-            speed_kmh,
-            data_source,
-            origin_lat,
-            origin_lon,
-            dest_lat,
-            dest_lon
-        ))
-        self.conn.commit()
+        with self._write_lock:
+            self._write_cursor.execute(_SQL_INSERT_AREA_SAMPLE, (
+                snapshot_id,  # Use snapshot_id as route_id for area-wide data
+                area_id,
+                travel_time_seconds,
+                distance_meters,
+                speed_kmh,
+                data_source,
+                origin_lat,
+                origin_lon,
+                dest_lat,
+                dest_lon
+            ))
+
+    def store_od_traffic_sample(
+        self,
+        origin_lat: float,
+        origin_lon: float,
+        dest_lat: float,
+        dest_lon: float,
+        travel_time_seconds: int,
+        distance_meters: int,
+        traffic_delay_seconds: int = None,
+        speed_kmh: float = None,
+        area_id: str = None,
+        timestamp: str = None,
+        data_source: str = "google_maps"
+    ) -> int:
+        """
+        Store an origin/destination measurement not tied to a probe route;
+        area_id links it to an area, timestamp None lets SQLite stamp it.
+        Returns the row id
+        """
+        with self._write_lock:
+            self._write_cursor.execute(f"""
+                INSERT INTO real_traffic_data
+                (area_id, timestamp, travel_time_seconds, distance_meters,
+                 traffic_delay_seconds, speed_kmh, data_source,
+                 origin_lat, origin_lon, dest_lat, dest_lon)
+                VALUES (?, COALESCE(?, {_SQL_NOW}), ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                area_id, timestamp, travel_time_seconds, distance_meters,
+                traffic_delay_seconds, speed_kmh, data_source,
+                origin_lat, origin_lon, dest_lat, dest_lon
+            ))
+            return self._write_cursor.lastrowid
+
+    def store_area_traffic_samples_bulk(self, area_id: str, snapshot_id: str, rows: List[tuple],
+                                        data_source: str = "google_maps"):
+        """
+        Store all samples of one area snapshot in a single transaction
+
+        Args:
+            rows: (origin_lat, origin_lon, dest_lat, dest_lon,
+                travel_time_seconds, distance_meters, speed_kmh) tuples
+        """
+        with self._transaction():
+            self.conn.executemany(_SQL_INSERT_AREA_SAMPLE, [
+                (snapshot_id, area_id, travel_time, distance, speed, data_source,
+                 origin_lat, origin_lon, dest_lat, dest_lon)
+                for origin_lat, origin_lon, dest_lat, dest_lon, travel_time, distance, speed in rows
+            ])
 
     def store_area_snapshot(
         self,
@@ -724,34 +1863,36 @@ class DigitalTwinDatabase:
         max_speed_kmh: float = None
     ):
         """Store aggregated snapshot of area traffic"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO area_traffic_snapshots
-            (area_id, snapshot_id, snapshot_timestamp, num_samples,
-             avg_speed_kmh, min_speed_kmh, max_speed_kmh)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            area_id,
-            snapshot_id,
-            datetime.now().isoformat(),
-            num_samples,
-            avg_speed_kmh,
-            min_speed_kmh,
-            max_speed_kmh
-        ))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                INSERT INTO area_traffic_snapshots
+                (area_id, snapshot_id, snapshot_timestamp, num_samples,
+                 avg_speed_kmh, min_speed_kmh, max_speed_kmh)
+                VALUES (?, ?, {_SQL_NOW}, ?, ?, ?, ?)
+            """, (
+                area_id,
+                snapshot_id,
+                num_samples,
+                avg_speed_kmh,
+                min_speed_kmh,
+                max_speed_kmh
+            ))
 
     def get_area_traffic_data(
         self,
         area_id: str,
         start_time: str = None,
         end_time: str = None,
-        limit: int = None
-    ) -> List[Dict]:
-        """Get all training data for an area"""
-        cursor = self.conn.cursor()
-
-        query = "SELECT * FROM real_traffic_data WHERE area_id = ?"
+        limit: int = None,
+        before: str = None,
+        before_id: int = None
+    ) -> List[RealTrafficRow]:
+        """
+        Get all training data for an area (rows support row['column'] like dicts),
+        newest first; page with before/before_id as in iter_real_traffic_data
+        """
+        query = f"SELECT {self._real_traffic_columns} FROM real_traffic_data WHERE area_id = ?"
         params = [area_id]
 
         if start_time:
@@ -760,30 +1901,88 @@ class DigitalTwinDatabase:
         if end_time:
             query += " AND timestamp <= ?"
             params.append(end_time)
+        if before and before_id is not None:
+            query += " AND (timestamp, id) < (?, ?)"
+            params.extend((before, before_id))
+        elif before:
+            query += " AND timestamp < ?"
+            params.append(before)
 
-        query += " ORDER BY timestamp DESC"
+        query += " ORDER BY timestamp DESC, id DESC"
 
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT ?"
+            params.append(int(limit))
 
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        return list(self._iter_rows(query, params, RealTrafficRow))
 
-    def get_area_snapshots(self, area_id: str, limit: int = None) -> List[Dict]:
+    def get_area_snapshots(self, area_id: str, limit: int = None, start_time: str = None) -> List[Dict]:
         """Get area traffic snapshots"""
-        cursor = self.conn.cursor()
+        with self.reader() as conn:
+            cursor = conn.cursor()
 
-        query = """
-            SELECT * FROM area_traffic_snapshots
-            WHERE area_id = ?
-            ORDER BY snapshot_timestamp DESC
-        """
+            cursor.row_factory = None  # Plain tuples, see _fetch_dicts
 
-        if limit:
-            query += f" LIMIT {limit}"
+            query = "SELECT * FROM area_traffic_snapshots WHERE area_id = ?"
+            params = [area_id]
+
+            if start_time:
+                query += " AND snapshot_timestamp >= ?"
+                params.append(start_time)
+
+            query += " ORDER BY snapshot_timestamp DESC"
+
+            if limit:
+                query += " LIMIT ?"
+                params.append(int(limit))
+
+            cursor.execute(query, params)
+            return self._fetch_dicts(cursor)
 
-        cursor.execute(query, (area_id,))
-        return [dict(row) for row in cursor.fetchall()]
+    def get_area_speed_stats(self, area_id: str, start_time: str = None) -> Dict:
+        """
+        Aggregate snapshot speeds for an area inside SQLite
+
+        Snapshots with a missing or zero average speed are counted but
+        excluded from the speed statistics. Standard deviation is the
+        population value, derived from SUM(x) and SUM(x*x).
+        """
+        with self.reader() as conn:
+            cursor = conn.cursor()
+
+            query = """
+                SELECT COUNT(*) AS num_snapshots,
+                       COUNT(NULLIF(avg_speed_kmh, 0)) AS num_speeds,
+                       AVG(NULLIF(avg_speed_kmh, 0)) AS avg_speed,
+                       MIN(NULLIF(avg_speed_kmh, 0)) AS min_speed,
+                       MAX(NULLIF(avg_speed_kmh, 0)) AS max_speed,
+                       SUM(NULLIF(avg_speed_kmh, 0) * NULLIF(avg_speed_kmh, 0)) AS sum_sq
+                FROM area_traffic_snapshots
+                WHERE area_id = ?
+            """
+            params = [area_id]
+
+            if start_time:
+                query += " AND snapshot_timestamp >= ?"
+                params.append(start_time)
+
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+
+            num_speeds = row['num_speeds']
+            if num_speeds:
+                variance = row['sum_sq'] / num_speeds - row['avg_speed'] ** 2
+                std_speed = max(variance, 0.0) ** 0.5
+            else:
+                std_speed = 0
+
+            return {
+                'num_snapshots': row['num_snapshots'],
+                'avg_speed_kmh': row['avg_speed'] or 0,
+                'min_speed_kmh': row['min_speed'] or 0,
+                'max_speed_kmh': row['max_speed'] or 0,
+                'std_speed_kmh': std_speed
+            }
 
     # ========== CALIBRATION HISTORY (NEW) ==========
 
@@ -798,91 +1997,185 @@ class DigitalTwinDatabase:
         notes: str = None
     ):
         """Store calibration attempt for area"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO calibration_history
-            (area_id, calibration_date, sumo_params, accuracy_mae,
-             accuracy_rmse, accuracy_mape, num_validation_samples, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            area_id,
-            datetime.now().isoformat(),
-            json.dumps(sumo_params),
-            accuracy_mae,
-            accuracy_rmse,
-            accuracy_mape,
-            num_samples,
-            notes
-        ))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                INSERT INTO calibration_history
+                (area_id, calibration_date, sumo_params, accuracy_mae,
+                 accuracy_rmse, accuracy_mape, num_validation_samples, notes)
+                VALUES (?, {_SQL_NOW}, ?, ?, ?, ?, ?, ?)
+            """, (
+                area_id,
+                _dump_json(sumo_params),
+                accuracy_mae,
+                accuracy_rmse,
+                accuracy_mape,
+                num_samples,
+                notes
+            ))
 
     def get_best_area_calibration(self, area_id: str) -> Dict:
         """Get best calibration for area (lowest RMSE)"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM calibration_history
-            WHERE area_id = ?
-            ORDER BY accuracy_rmse ASC
-            LIMIT 1
-        """, (area_id,))
-
-        row = cursor.fetchone()
-        if row:
-            result = dict(row)
-            result['sumo_params'] = json.loads(result['sumo_params'])
-            return result
-        return None
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM calibration_history
+                WHERE area_id = ?
+                ORDER BY accuracy_rmse ASC
+                LIMIT 1
+            """, (area_id,))
+
+            row = cursor.fetchone()
+            if row:
+                result = dict(row)
+                result['sumo_params'] = _load_json(result['sumo_params'])
+                return result
+            return None
 
     # ========== UTILITY ==========
 
-    def get_summary_stats(self) -> Dict:
-        """Get database summary statistics"""
-        cursor = self.conn.cursor()
-
-        stats = {}
-
-        # Count monitored areas
-        cursor.execute("SELECT COUNT(*) as count FROM monitored_areas")
-        stats['monitored_areas'] = cursor.fetchone()['count']
-
-        # Count areas by status
-        cursor.execute("SELECT COUNT(*) as count FROM monitored_areas WHERE status = 'trained'")
-        stats['trained_areas'] = cursor.fetchone()['count']
+    def _json_object_sql(self, conn: sqlite3.Connection, table: str) -> str:
+        """json_object(...) expression over every column of table"""
+        columns = [row[1] for row in conn.execute("SELECT * FROM pragma_table_info(?)", (table,))]
+        if not columns:
+            raise ValueError(f"Unknown table: {table}")
 
-        cursor.execute("SELECT COUNT(*) as count FROM monitored_areas WHERE status = 'training'")
-        stats['training_areas'] = cursor.fetchone()['count']
+        # Stored JSON payloads (text or JSONB) are embedded as JSON, not strings
+        pairs = ', '.join(
+            f"'{column}', json({column})" if column in _JSON_PAYLOAD_COLUMNS else f"'{column}', {column}"
+            for column in columns
+        )
+        return f"json_object({pairs})"
 
-        # Count probe routes
-        cursor.execute("SELECT COUNT(*) as count FROM probe_routes WHERE active = 1")
-        stats['active_routes'] = cursor.fetchone()['count']
+    def export_json(self, table: str, where_sql: str = "", params=()) -> str:
+        """
+        Export rows of a table as a JSON array built entirely by SQLite
 
-        # Count primary routes
-        cursor.execute("SELECT COUNT(*) as count FROM probe_routes WHERE is_primary = 1")
-        stats['primary_routes'] = cursor.fetchone()['count']
+        Args:
+            table: Table (or view) name
+            where_sql: Optional condition, e.g. "route_id = ?"
+            params: Parameters for where_sql
 
-        # Count real data points
-        cursor.execute("SELECT COUNT(*) as count FROM real_traffic_data")
-        stats['real_data_points'] = cursor.fetchone()['count']
+        Returns:
+            Serialized JSON text, ready to write out without json.dumps
+            (REAL values carry SQLite's 15 significant digits)
+        """
+        with self.reader() as conn:
+            obj = self._json_object_sql(conn, table)
+            where = f" WHERE {where_sql}" if where_sql else ""
+            row = conn.execute(f'SELECT json_group_array({obj}) FROM "{table}"{where}', params).fetchone()
+            return row[0]
+
+    def iter_export_json(self, table: str, where_sql: str = "", params=()):
+        """Like export_json, but yield one serialized JSON object per row"""
+        with self.reader() as conn:
+            obj = self._json_object_sql(conn, table)
+            where = f" WHERE {where_sql}" if where_sql else ""
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(f'SELECT {obj} FROM "{table}"{where}', params)
+            while True:
+                rows = cursor.fetchmany(self.FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for (text,) in rows:
+                    yield text
+
+    @staticmethod
+    def _fetch_dicts(cursor) -> List[Dict]:
+        """
+        fetchall() as dicts from a plain-tuple cursor: the column names are
+        read once from cursor.description and zipped with each row, which
+        is cheaper than dict(sqlite3.Row) (a by-name lookup per column)
+        """
+        keys = [column[0] for column in cursor.description]
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
 
-        # Count area snapshots
-        cursor.execute("SELECT COUNT(*) as count FROM area_traffic_snapshots")
-        stats['area_snapshots'] = cursor.fetchone()['count']
+    def get_change_count(self) -> int:
+        """Rows written through this connection so far (cheap cache fingerprint)"""
+        return self.conn.total_changes
 
-        # Count simulation results
-        cursor.execute("SELECT COUNT(*) as count FROM simulation_results")
-        stats['simulation_results'] = cursor.fetchone()['count']
+    def get_summary_stats(self) -> Dict:
+        """
+        Get database summary statistics
 
-        # Count scenarios
-        cursor.execute("SELECT COUNT(DISTINCT scenario_id) as count FROM simulation_results")
-        stats['scenarios'] = cursor.fetchone()['count']
+        Polled by dashboards, so a result is reused for up to STATS_TTL
+        seconds as long as nothing was written through this connection
+        (writes by other processes show up once the TTL expires).
+        """
+        with self._stats_lock:
+            stats, cached_at, changes = self._stats_cache
+            if (stats is not None and changes == self.conn.total_changes
+                    and time.monotonic() - cached_at < self.STATS_TTL):
+                return dict(stats)
+
+            changes = self.conn.total_changes
+            stats = self._query_summary_stats()
+            self._stats_cache = (stats, time.monotonic(), changes)
+            return dict(stats)
+
+    def _query_summary_stats(self) -> Dict:
+        """Read the summary statistics from the database"""
+        with self.reader() as conn:
+            cursor = conn.cursor()
+
+            cursor.row_factory = None  # Plain tuples, unpacked below
+
+            # One round trip: each table is aggregated once, its
+            # conditional counts as SUMs over the same scan. Large tables
+            # come from the trigger-maintained counters (no COUNT(*) scans).
+            cursor.execute("""
+                SELECT a.total, a.trained, a.training,
+                       r.active, r.is_primary,
+                       c.real_data, c.archived, c.snapshots, c.sim_results,
+                       (SELECT COUNT(*) FROM simulation_scenarios)
+                FROM (
+                    SELECT COUNT(*) AS total,
+                           COALESCE(SUM(status = 'trained'), 0) AS trained,
+                           COALESCE(SUM(status = 'training'), 0) AS training
+                    FROM monitored_areas
+                ) a, (
+                    SELECT COALESCE(SUM(active = 1), 0) AS active,
+                           COALESCE(SUM(is_primary = 1), 0) AS is_primary
+                    FROM probe_routes
+                ) r, (
+                    SELECT COALESCE(SUM(CASE WHEN name = 'real_traffic_data' THEN n END), 0) AS real_data,
+                           COALESCE(SUM(CASE WHEN name = 'real_traffic_data_archived' THEN n END), 0) AS archived,
+                           COALESCE(SUM(CASE WHEN name = 'area_traffic_snapshots' THEN n END), 0) AS snapshots,
+                           COALESCE(SUM(CASE WHEN name = 'simulation_results' THEN n END), 0) AS sim_results
+                    FROM row_counters
+                ) c
+            """)
+            (monitored_areas, trained_areas, training_areas,
+             active_routes, primary_routes,
+             real_data_points, archived_data_points, area_snapshots, simulation_results,
+             scenarios) = cursor.fetchone()
+
+            stats = {
+                'monitored_areas': monitored_areas,
+                'trained_areas': trained_areas,
+                'training_areas': training_areas,
+                'active_routes': active_routes,
+                'primary_routes': primary_routes,
+                'real_data_points': real_data_points,
+                'archived_data_points': archived_data_points,
+                'area_snapshots': area_snapshots,
+                'simulation_results': simulation_results,
+                'scenarios': scenarios
+            }
 
-        return stats
+            return stats
     
     def close(self):
         """Close database connection"""
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
         if self.conn:
+            # Refresh planner statistics for tables whose contents changed
+            # a lot this session (cheap no-op otherwise)
+            self.conn.execute("PRAGMA optimize")
             self.conn.close()
-            print("[DB] Database connection closed")
+            logger.debug("Database connection closed")
 
 # Global database instance
 _db = None
@@ -1,7 +1,15 @@
 import os
 import subprocess
 import xml.etree.ElementTree as ET
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+
+# Edge shape points per network file, keyed by (path, mtime):
+# (location attributes, xs, ys, edge index per point, edge ids)
+_NET_INDEX_CACHE: Dict[Tuple[str, float], Tuple[Dict[str, str], np.ndarray, np.ndarray, np.ndarray, List[str]]] = {}
+# pyproj Transformers from WGS84, per network projParameter
+_TRANSFORMERS = {}
 
 def generate_routes(net_file, output_dir, sim_time=3600, trip_rate=3.0):
     """Generate random trips based on the network with validation."""
@@ -28,29 +36,126 @@ def generate_routes(net_file, output_dir, sim_time=3600, trip_rate=3.0):
     return route_file
 
 
+def _parse_shape(shape: str) -> np.ndarray:
+    """
+    Lane shape "x,y x,y ..." as an (n, 2) array
+
+    Plain 2D shapes take one C-level parse. Anything else is parsed point
+    by point, skipping 3D or malformed points and keeping the rest.
+    """
+    num_points = shape.count(',')
+    if num_points == shape.count(' ') + 1:
+        try:
+            values = np.fromstring(shape.replace(',', ' '), sep=' ')
+        except ValueError:
+            values = None
+        if values is not None and values.size == 2 * num_points:
+            return values.reshape(-1, 2)
+
+    points = []
+    for point in shape.split():
+        try:
+            x, y = point.split(',')
+            points.append((float(x), float(y)))
+        except ValueError:
+            continue
+    return np.array(points, dtype=np.float64).reshape(-1, 2)
+
+
+def _load_edge_index(net_file: str):
+    """
+    Shape points of every non-internal edge (first lane with a shape) as
+    flat arrays, parsed once per network file version
+    """
+    key = (os.path.abspath(net_file), os.path.getmtime(net_file))
+    index = _NET_INDEX_CACHE.get(key)
+    if index is not None:
+        return index
+
+    location = {}
+    # Per-lane point arrays, concatenated once parsing is done
+    xs, ys, edge_idx, counts, edge_ids = [], [], [], [], []
+
+    # Streamed: each top-level element (edge, junction, connection, ...)
+    # is dropped once read, so memory stays O(one element), not O(file)
+    depth = 0
+    root = None
+    for event, elem in ET.iterparse(net_file, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+
+        if elem.tag == 'location':
+            location = dict(elem.attrib)
+        elif elem.tag == 'edge':
+            edge_id = elem.get('id')
+
+            # Skip internal edges
+            if not (edge_id and ':' in edge_id):
+                for lane in elem.findall('lane'):
+                    shape = lane.get('shape')
+                    if not shape:
+                        continue
+
+                    points = _parse_shape(shape)
+                    if len(points) == 0:
+                        continue  # No usable point, try the next lane
+
+                    xs.append(points[:, 0])
+                    ys.append(points[:, 1])
+                    edge_idx.append(len(edge_ids))
+                    counts.append(len(points))
+                    edge_ids.append(edge_id)
+                    break  # Only need to check first lane
+
+        if depth == 1:
+            root.clear()
+
+    index = (
+        location,
+        np.concatenate(xs) if xs else np.empty(0),
+        np.concatenate(ys) if ys else np.empty(0),
+        np.repeat(np.array(edge_idx, dtype=np.int64), counts),
+        edge_ids
+    )
+
+    # Drop indexes of older versions of the same file
+    for old_key in [k for k in _NET_INDEX_CACHE if k[0] == key[0]]:
+        del _NET_INDEX_CACHE[old_key]
+    _NET_INDEX_CACHE[key] = index
+    return index
+
+
+def _get_transformer(proj_param: str):
+    """WGS84 -> network projection transformer, created once per projection"""
+    transformer = _TRANSFORMERS.get(proj_param)
+    if transformer is None:
+        from pyproj import Transformer
+        transformer = Transformer.from_crs("EPSG:4326", proj_param, always_xy=True)
+        _TRANSFORMERS[proj_param] = transformer
+    return transformer
+
+
 def find_edges_near_point(net_file: str, lat: float, lon: float, max_distance: float = 1000.0) -> List[str]:
     """Find all edges within max_distance meters of a lat/lon point"""
-    import math
-
     try:
-        tree = ET.parse(net_file)
-        root = tree.getroot()
+        location, xs, ys, edge_idx, edge_ids = _load_edge_index(net_file)
 
         # Get network projection info
-        location = root.find('location')
         target_x, target_y = lon, lat
 
-        if location is not None:
+        if location:
             proj_param = location.get('projParameter', '')
             net_offset_str = location.get('netOffset', '0.0,0.0')
 
             if 'proj=utm' in proj_param or 'proj=merc' in proj_param:
                 # Convert lat/lon to network coordinates
                 try:
-                    from pyproj import Transformer
                     offset_x, offset_y = map(float, net_offset_str.split(','))
-                    transformer = Transformer.from_crs("EPSG:4326", proj_param, always_xy=True)
-                    utm_x, utm_y = transformer.transform(lon, lat)
+                    utm_x, utm_y = _get_transformer(proj_param).transform(lon, lat)
                     target_x = utm_x + offset_x
                     target_y = utm_y + offset_y
                     print(f"[DEMAND_GEN] Converted {lat},{lon} to network coords {target_x:.2f},{target_y:.2f}")
@@ -58,41 +163,12 @@ def find_edges_near_point(net_file: str, lat: float, lon: float, max_distance: f
                     print(f"[DEMAND_GEN] Coordinate conversion failed: {e}")
                     return []
 
-        # Find all edges within distance
-        nearby_edges = []
-
-        for edge in root.findall('.//edge'):
-            edge_id = edge.get('id')
-
-            # Skip internal edges
-            if edge_id and ':' in edge_id:
-                continue
-
-            # Get edge shape
-            for lane in edge.findall('lane'):
-                shape = lane.get('shape')
-                if not shape:
-                    continue
-
-                # Check if any point on the edge is within distance
-                points = shape.split()
-                for point in points:
-                    try:
-                        x, y = point.split(',')
-                        point_x, point_y = float(x), float(y)
-
-                        # Calculate distance
-                        dx = target_x - point_x
-                        dy = target_y - point_y
-                        distance = math.sqrt(dx*dx + dy*dy)
-
-                        if distance <= max_distance:
-                            if edge_id not in nearby_edges:
-                                nearby_edges.append(edge_id)
-                            break
-                    except:
-                        continue
-                break  # Only need to check first lane
+        # Find all edges with a shape point within distance (squared
+        # distances, so no sqrt per point); edge order follows the file
+        dx = xs - target_x
+        dy = ys - target_y
+        mask = dx * dx + dy * dy <= max_distance * max_distance
+        nearby_edges = [edge_ids[i] for i in np.unique(edge_idx[mask])]
 
         print(f"[DEMAND_GEN] Found {len(nearby_edges)} edges within {max_distance}m of {lat},{lon}")
         return nearby_edges
@@ -117,14 +117,13 @@ class DynamicCalibrator:
         try:
             # Priority 1: Try to get area-specific data collected before this simulation
             if self.scenario_id:
-                cursor = self.db.conn.cursor()
-                cursor.execute("""
-                    SELECT speed_kmh
-                    FROM real_traffic_data
-                    WHERE area_id = ? AND speed_kmh IS NOT NULL
-                    ORDER BY timestamp DESC
-                """, (self.scenario_id,))
-                results = cursor.fetchall()
+                with self.db.reader() as conn:
+                    results = conn.execute("""
+                        SELECT speed_kmh
+                        FROM real_traffic_data
+                        WHERE area_id = ? AND speed_kmh IS NOT NULL
+                        ORDER BY timestamp DESC
+                    """, (self.scenario_id,)).fetchall()
 
                 if results:
                     speeds = [r['speed_kmh'] for r in results if r['speed_kmh']]
@@ -139,15 +138,14 @@ class DynamicCalibrator:
                         }
 
             # Priority 2: Try recent real_traffic_data from any area
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                SELECT speed_kmh
-                FROM real_traffic_data
-                WHERE speed_kmh IS NOT NULL
-                ORDER BY timestamp DESC
-                LIMIT 10
-            """)
-            results = cursor.fetchall()
+            with self.db.reader() as conn:
+                results = conn.execute("""
+                    SELECT speed_kmh
+                    FROM real_traffic_data
+                    WHERE speed_kmh IS NOT NULL
+                    ORDER BY timestamp DESC
+                    LIMIT 10
+                """).fetchall()
 
             if results:
                 speeds = [r['speed_kmh'] for r in results if r['speed_kmh']]
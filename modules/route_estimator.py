@@ -140,7 +140,8 @@ class RouteEstimator:
                     target_x, target_y = lon, lat
 
             nearest_edge = None
-            min_distance = float('inf')
+            # Compared squared; one sqrt once the nearest point is known
+            min_distance_sq = float('inf')
             sample_coords = []
 
             # Iterate through all edges
@@ -174,14 +175,16 @@ class RouteEstimator:
                             # Both are in UTM meters, so use simple Euclidean distance
                             dx = target_x - point_x
                             dy = target_y - point_y
-                            distance = math.sqrt(dx*dx + dy*dy)
+                            distance_sq = dx*dx + dy*dy
 
-                            if distance < min_distance:
-                                min_distance = distance
+                            if distance_sq < min_distance_sq:
+                                min_distance_sq = distance_sq
                                 nearest_edge = edge_id
                         except Exception as e:
                             continue
 
+            min_distance = math.sqrt(min_distance_sq)
+
             if len(sample_coords) > 0:
                 print(f"[ROUTE_ESTIMATOR] Sample network coordinates: {sample_coords[:3]}")
                 print(f"[ROUTE_ESTIMATOR] Looking for: lat={lat}, lon={lon} → network coords ({target_x:.2f}, {target_y:.2f})")
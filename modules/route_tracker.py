@@ -219,7 +219,7 @@ class RouteMonitor:
         """Save simulation results to database"""
         print(f"\n[ROUTE_MONITOR] Saving results for scenario: {scenario_id}")
         
-        saved_count = 0
+        rows = []
         
         for route_id, measurements in self.route_measurements.items():
             if not measurements:
@@ -238,19 +238,14 @@ class RouteMonitor:
             else:
                 avg_speed_kmh = 0
             
-            # Save to database
-            self.db.store_simulation_result(
-                scenario_id=scenario_id,
-                route_id=route_id,
-                travel_time_seconds=avg_travel_time,
-                distance_meters=distance_meters,
-                avg_speed_kmh=avg_speed_kmh,
-                num_vehicles=len(measurements)
-            )
-            
-            saved_count += 1
+            rows.append((route_id, avg_travel_time, distance_meters, avg_speed_kmh, len(measurements), None))
             print(f"[ROUTE_MONITOR]   ✅ {route_id}: {len(measurements)} samples, {avg_travel_time:.1f}s avg")
         
+        # Save to database in one transaction
+        if rows:
+            self.db.store_simulation_result_bulk(scenario_id, rows)
+        
+        saved_count = len(rows)
         if saved_count > 0:
             print(f"[ROUTE_MONITOR] ✅ Saved {saved_count} route results to database")
         else:
@@ -44,6 +44,12 @@ def create_config(net_file, route_file, cfg_path, sim_time=3600):
 
     os.makedirs(os.path.dirname(cfg_path), exist_ok=True)
 
+    # Skip the write when an identical config is already on disk
+    if os.path.exists(cfg_path):
+        with open(cfg_path, "r") as f:
+            if f.read() == cfg_content:
+                return cfg_path
+
     with open(cfg_path, "w") as f:
         f.write(cfg_content)
 
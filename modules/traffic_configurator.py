@@ -17,13 +17,12 @@ class TrafficConfigurator:
     def get_real_world_metrics(self, scenario_id: str) -> Optional[Dict]:
         """Get real-world traffic metrics for this area"""
         try:
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                SELECT speed_kmh, travel_time_seconds, distance_meters
-                FROM real_traffic_data
-                WHERE area_id = ? AND speed_kmh IS NOT NULL
-            """, (scenario_id,))
-            results = cursor.fetchall()
+            with self.db.reader() as conn:
+                results = conn.execute("""
+                    SELECT speed_kmh, travel_time_seconds, distance_meters
+                    FROM real_traffic_data
+                    WHERE area_id = ? AND speed_kmh IS NOT NULL
+                """, (scenario_id,)).fetchall()
 
             if not results:
                 print("[TRAFFIC_CONFIG] No real-world data found for this area")
@@ -160,17 +159,17 @@ class TrafficConfigurator:
             vehicle_count = 0
 
             # Handle <vehicle> tags
-            for vehicle in root.findall('.//vehicle'):
+            for vehicle in root.iter('vehicle'):
                 vehicle.set('type', 'cairo_car')
                 vehicle_count += 1
 
             # Handle <trip> tags (more common from randomTrips.py)
-            for trip in root.findall('.//trip'):
+            for trip in root.iter('trip'):
                 trip.set('type', 'cairo_car')
                 vehicle_count += 1
 
             # Modify flows to increase vehicle count based on congestion
-            for flow in root.findall('.//flow'):
+            for flow in root.iter('flow'):
                 flow.set('type', 'cairo_car')
 
                 # Increase flow rate for congestion
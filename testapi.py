@@ -175,7 +175,7 @@ def test_bbox_file_creation():
     if os.path.exists(bbox_file):
         print(f"\n✅ Bbox file created: {bbox_file}")
         
-        with open(bbox_file, 'r') as f:
+        with open(bbox_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
         print(f"\nFile contents:")